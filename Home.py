@@ -1,8 +1,16 @@
 import streamlit as st
 from PIL import Image
+from utils.loader import load_aggregates
+from utils.refresh import start_refresher
 
 st.set_page_config(page_title="Home")
 
+# Pré-carrega os cubos agregados para as páginas / Warm the aggregate cubes for the pages
+load_aggregates()
+
+# Atualiza os cubos em segundo plano quando o csv muda / Refresh the cubes in the background when the csv changes
+start_refresher()
+
 image_path = "logo.jpg"
 image = Image.open( image_path )
 st.sidebar.image( image, width=120)
@@ -0,0 +1,255 @@
+"""Benchmark of every dashboard computation on synthetic orders
+
+    Times the cleaning, the aggregation, each headless metric (package
+    metrics) and each chart function of the three pages at several dataset sizes, with wall time and peak traced memory,
+    and saves the results as JSON so two commits can be compared.
+
+    Usage: python -m benchmarks.bench_dashboard [--rows 10000,1000000,10000000]
+                                                [--repeat 3] [--output results.json]
+                                                [--compare previous.json]
+"""
+# Libraries
+import argparse
+import ast
+import json
+import logging
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import metrics
+from benchmarks.synthetic import synthetic_orders
+from metrics.restaurants import TIME_GROUPINGS
+from utils.cleaning import clean_code
+from utils.cube import time_summary
+from utils.filters import make_filters
+from utils.geo import add_distance
+from utils.schema import apply_schema
+from utils.streaming import aggregates_from_frame
+from utils.timeseries import growth
+
+#====================================================================
+
+PAGES = { 'company': 'pages/1_company_vision.py',
+          'deliverers': 'pages/2_deliverers_vision.py',
+          'restaurants': 'pages/3_restaurants_vision.py' }
+
+# Filtros padrão da barra lateral (todos os valores marcados = sem filtro) / Default sidebar filters (every value selected = no filter)
+DEFAULT_DATE = datetime( 2022, 3, 13 )
+DEFAULT_FILTERS = make_filters( date_to=DEFAULT_DATE - timedelta( days=1 ) )
+
+DEFAULT_ROWS = [10_000, 1_000_000, 10_000_000]
+
+# A partir de quantos pedidos cada cubo deve ter no máximo MAX_CUBE_SHARE linhas por pedido
+# From how many orders every cube must have at most MAX_CUBE_SHARE rows per order
+CUBE_CHECK_ORDERS = 100_000
+MAX_CUBE_SHARE = 0.5
+
+#====================================================================
+# Functions
+
+def _is_constant(node):
+    # Atribuição de um valor literal, ex. RANKING_METRICS = {...} / Assignment of a literal value, e.g. RANKING_METRICS = {...}
+    if not isinstance( node, ast.Assign ):
+        return False
+
+    try:
+        ast.literal_eval( node.value )
+    except ValueError:
+        return False
+
+    return True
+
+def page_functions(path):
+    """Functions of a page script, without running its streamlit layout
+
+        Only the imports, the constants (literal values) and the function
+        definitions of the script are executed, so the benchmark times the
+        code the page really runs.
+
+        Input: path: path of the page script
+        Output: dict name -> function
+    """
+    with open( path, encoding='utf-8' ) as f:
+        tree = ast.parse( f.read(), filename=path )
+
+    tree.body = [node for node in tree.body if isinstance( node, ( ast.Import, ast.ImportFrom, ast.FunctionDef ) ) or _is_constant( node )]
+    namespace = { '__name__': 'benchmarks.' + path }
+    exec( compile( tree, path, 'exec' ), namespace )
+
+    return { name: value for name, value in namespace.items() if isinstance( value, type( page_functions ) ) and value.__module__ == namespace['__name__'] }
+
+def quiet_streamlit():
+    # Fora do servidor o streamlit avisa a cada chamada / Outside the server streamlit warns on every call
+    for name in list( logging.root.manager.loggerDict ):
+        if name.startswith( 'streamlit' ):
+            logging.getLogger( name ).setLevel( logging.ERROR )
+
+def measure(func, repeat):
+    """Best wall time of func over repeat runs and the peak memory of one traced run
+
+        Input: func: callable without arguments
+               repeat: number of timed runs
+        Output: (result, seconds, peak bytes)
+    """
+    seconds = []
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        result = func()
+        seconds.append( time.perf_counter() - start )
+
+    # Memória medida à parte: o tracemalloc deixa o código mais lento / Memory measured apart: tracemalloc slows the code down
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, min( seconds ), peak
+
+def check_cube_sizes(aggregates):
+    """Fail when a cube does not collapse the orders (a key close to one row per order)
+
+        Input: aggregates: utils.streaming.Aggregates
+        Output: the same aggregates
+    """
+    orders = int( aggregates.cube['orders'].sum() )
+    if orders < CUBE_CHECK_ORDERS:
+        return aggregates
+
+    for name in ( 'cube', 'locations', 'profiles' ):
+        rows = len( getattr( aggregates, name ) )
+        assert rows <= MAX_CUBE_SHARE * orders, f'{name} has {rows:,} rows for {orders:,} orders'
+
+    return aggregates
+
+def slices(aggregates, filters):
+    # Sem o cache de fatias, para medir o corte dos cubos / Without the slice cache, to time the slicing of the cubes
+    metrics.clear_slice_cache()
+
+    return tuple( metrics.filtered( aggregates, filters, cube ) for cube in ( 'cube', 'locations', 'profiles' ) )
+
+def uncached(metric, aggregates):
+    # Métrica chamada com os caches por filtro vazios / Metric called with the per-filter caches empty
+    metrics.clear_slice_cache()
+    metrics.clear_growth_cache()
+
+    return metric( aggregates, DEFAULT_FILTERS )
+
+def computations(functions):
+    """Dashboard computations in page order: name -> (inputs -> result)
+
+        Input: functions: dict page -> page_functions of the page
+        Output: dict name -> callable that receives the dict of computed inputs
+    """
+    company, deliverers, restaurants = functions['company'], functions['deliverers'], functions['restaurants']
+
+    return { 'clean_code': lambda data: clean_code( data['raw'] ),
+             'apply_schema+add_distance': lambda data: add_distance( apply_schema( data['clean_code'] ) ),
+             'aggregates': lambda data: check_cube_sizes( aggregates_from_frame( data['apply_schema+add_distance'] ) ),
+             'slice_cube': lambda data: slices( data['aggregates'], DEFAULT_FILTERS ),
+             # Métricas sem streamlit (usam as fatias em cache) / Metrics without streamlit (use the cached slices)
+             'orders_by_day': lambda data: metrics.orders_by_day( data['aggregates'], DEFAULT_FILTERS ),
+             # Motor sem o cache por filtro / Engine without the per-filter cache
+             'order_growth': lambda data: growth( metrics.filtered( data['aggregates'], DEFAULT_FILTERS ) ),
+             # Sem os caches de séries e fatias, senão mediria acertos do cache / Without the series and slice caches, else it would time cache hits
+             'orders_by_week': lambda data: uncached( metrics.orders_by_week, data['aggregates'] ),
+             'orders_per_deliverer_by_week': lambda data: uncached( metrics.orders_per_deliverer_by_week, data['aggregates'] ),
+             'orders_by_traffic': lambda data: metrics.orders_by_traffic( data['aggregates'], DEFAULT_FILTERS ),
+             'orders_by_city_traffic': lambda data: metrics.orders_by_city_traffic( data['aggregates'], DEFAULT_FILTERS ),
+             'traffic_centers': lambda data: metrics.traffic_centers( data['aggregates'], DEFAULT_FILTERS ),
+             # Motor sem o cache por filtro / Engine without the per-filter cache
+             'delivery_time_stats': lambda data: time_summary( metrics.filtered( data['aggregates'], DEFAULT_FILTERS ), TIME_GROUPINGS ),
+             'distance_by_city': lambda data: metrics.distance_by_city( data['aggregates'], DEFAULT_FILTERS ),
+             'ratings_per_deliverer': lambda data: metrics.ratings_per_deliverer( data['aggregates'], DEFAULT_FILTERS ),
+             'top_deliverers': lambda data: metrics.top_deliverers( data['aggregates'], DEFAULT_FILTERS, 10, 'time_max' ),
+             # Figuras das páginas / Page figures
+             'order_metric': lambda data: company['order_metric']( data['orders_by_day'] ),
+             'order_by_week': lambda data: company['order_by_week']( data['orders_by_week'] ),
+             'order_share_by_week': lambda data: company['order_share_by_week']( data['orders_per_deliverer_by_week'] ),
+             'week_over_week': lambda data: company['week_over_week']( data['order_growth'].weekly ),
+             'rolling_orders': lambda data: company['rolling_orders']( data['order_growth'].daily ),
+             'traffic_order_share': lambda data: company['traffic_order_share']( data['orders_by_traffic'] ),
+             'traffic_order_city': lambda data: company['traffic_order_city']( data['orders_by_city_traffic'] ),
+             'country_maps': lambda data: company['country_maps']( data['traffic_centers'] ),
+             'top_delivers': lambda data: deliverers['top_delivers']( data['aggregates'], DEFAULT_FILTERS, 10, 'Max Time' ),
+             'avg_std_time_delivery': lambda data: restaurants['avg_std_time_delivery']( data['delivery_time_stats'], 'Yes', 'std_time' ),
+             'avg_std_time_graph': lambda data: restaurants['avg_std_time_graph']( data['delivery_time_stats'] ),
+             'avg_std_time_on_traffic': lambda data: restaurants['avg_std_time_on_traffic']( data['delivery_time_stats'] ),
+             'distance': lambda data: restaurants['distance']( data['distance_by_city'] ) }
+
+def run(rows_list, repeat):
+    """Run every computation at every size
+
+        Input: rows_list: list of dataset sizes
+               repeat: timed runs per computation
+        Output: list of dicts with rows, computation, seconds and peak_bytes
+    """
+    functions = { page: page_functions( path ) for page, path in PAGES.items() }
+    quiet_streamlit()
+    steps = computations( functions )
+    results = []
+
+    for rows in rows_list:
+        data = { 'raw': synthetic_orders( rows ) }
+
+        for name, step in steps.items():
+            data[name], seconds, peak = measure( lambda: step( data ), repeat )
+            results.append( { 'rows': rows, 'computation': name, 'seconds': seconds, 'peak_bytes': peak } )
+            print( f'{rows:>11,}  {name:<28}{seconds:>10.4f}s{peak / 2**20:>11.1f} MB', flush=True )
+
+        del data
+
+    return results
+
+def environment():
+    """Commit and library versions the results belong to"""
+    try:
+        commit = subprocess.run( ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True ).stdout.strip()
+    except ( OSError, subprocess.CalledProcessError ):
+        commit = None
+
+    return { 'commit': commit,
+             'date': datetime.now().isoformat( timespec='seconds' ),
+             'python': platform.python_version(),
+             'pandas': pd.__version__,
+             'numpy': np.__version__,
+             'machine': platform.machine() }
+
+def compare(results, previous):
+    """Time and memory ratios against a previous results file
+
+        Input: results: list of result dicts of this run
+               previous: contents of a previous results file
+        Output: Dataframe with one row per (rows, computation) found in both runs
+    """
+    now = pd.DataFrame( results ).set_index( ['rows', 'computation'] )
+    before = pd.DataFrame( previous['results'] ).set_index( ['rows', 'computation'] )
+
+    df_aux = now.join( before, how='inner', lsuffix='_now', rsuffix='_before' )
+    df_aux['time_ratio'] = ( df_aux['seconds_now'] / df_aux['seconds_before'] ).round( 2 )
+    df_aux['memory_ratio'] = ( df_aux['peak_bytes_now'] / df_aux['peak_bytes_before'] ).round( 2 )
+
+    return df_aux.loc[: , ['seconds_before', 'seconds_now', 'time_ratio', 'memory_ratio']]
+
+#====================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser( description='Benchmark of the dashboard computations' )
+    parser.add_argument( '--rows', default=','.join( str( rows ) for rows in DEFAULT_ROWS ), help='comma separated dataset sizes' )
+    parser.add_argument( '--repeat', type=int, default=3, help='timed runs per computation (best is kept)' )
+    parser.add_argument( '--output', default='benchmark_results.json', help='JSON file with the results' )
+    parser.add_argument( '--compare', help='previous results file to compare with' )
+    args = parser.parse_args()
+
+    results = run( [int( rows ) for rows in args.rows.split( ',' )], args.repeat )
+
+    with open( args.output, 'w', encoding='utf-8' ) as f:
+        json.dump( { 'environment': environment(), 'results': results }, f, indent=2 )
+    print( f'results saved to {args.output}' )
+
+    if args.compare:
+        with open( args.compare, encoding='utf-8' ) as f:
+            print( compare( results, json.load( f ) ).to_string() )
@@ -0,0 +1,43 @@
+"""Benchmark of utils.geo.haversine_km against the haversine package
+
+    Usage: python -m benchmarks.bench_distance [rows]
+"""
+# Libraries
+import sys
+import time
+import numpy as np
+from haversine import haversine
+from utils.geo import haversine_km
+
+#====================================================================
+# Functions
+
+def random_points(rows, seed=42):
+    # Coordenadas na faixa do dataset / Coordinates in the dataset range
+    rng = np.random.default_rng( seed )
+    lat1 = rng.uniform( 9, 31, rows )
+    lon1 = rng.uniform( 72, 89, rows )
+
+    return lat1, lon1, lat1 + rng.uniform( 0, 0.2, rows ), lon1 + rng.uniform( 0, 0.2, rows )
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+
+    return result, time.perf_counter() - start
+
+def main(rows):
+    lat1, lon1, lat2, lon2 = random_points( rows )
+
+    vectorized, t_vectorized = timed( lambda: haversine_km( lat1, lon1, lat2, lon2 ) )
+
+    # O pacote é chamado por linha, como no antigo apply / The package is called per row, like the old apply
+    package, t_package = timed( lambda: np.array( [haversine( ( a, b ), ( c, d ) ) for a, b, c, d in zip( lat1, lon1, lat2, lon2 )] ) )
+
+    print( f'rows: {rows}' )
+    print( f'haversine package (per row): {t_package:.3f}s' )
+    print( f'utils.geo.haversine_km:      {t_vectorized:.3f}s ({t_package / t_vectorized:.0f}x)' )
+    print( f'max abs difference:          {np.abs( vectorized - package ).max():.2e} km' )
+
+if __name__ == '__main__':
+    main( int( sys.argv[1] ) if len( sys.argv ) > 1 else 1_000_000 )
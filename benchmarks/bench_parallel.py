@@ -0,0 +1,34 @@
+"""Scaling of utils.parallel.parallel_aggregates from 1 to N worker processes
+
+    Usage: python -m benchmarks.bench_parallel path/to/train.csv [max_workers]
+"""
+# Libraries
+import os
+import sys
+import time
+from utils import parallel
+from utils.cube import rollup
+
+#====================================================================
+# Functions
+
+def main(path, max_workers):
+    # Partições menores para que todos os processos recebam trabalho / Smaller partitions so every process gets work
+    parallel.PARTITION_BYTES = max( 1, os.path.getsize( path ) // ( 4 * max_workers ) )
+
+    baseline = None
+    reference = None
+    for workers in range( 1, max_workers + 1 ):
+        start = time.perf_counter()
+        aggregates = parallel.parallel_aggregates( path, workers )
+        elapsed = time.perf_counter() - start
+
+        result = rollup( aggregates.cube, ['City', 'Road_traffic_density'], distinct=True )
+        if reference is None:
+            baseline, reference = elapsed, result
+        assert result.equals( reference ), 'partial results merged differently'
+
+        print( f'workers: {workers:2d}  wall: {elapsed:7.2f}s  speedup: {baseline / elapsed:5.2f}x' )
+
+if __name__ == '__main__':
+    main( sys.argv[1], int( sys.argv[2] ) if len( sys.argv ) > 2 else ( os.cpu_count() or 1 ) )
@@ -0,0 +1,87 @@
+"""Synthetic orders with the layout and the messy encodings of train.csv
+
+    Usage: python -m benchmarks.synthetic rows output.csv
+"""
+# Libraries
+import sys
+import numpy as np
+import pandas as pd
+
+#====================================================================
+# Valores do export original (com os espaços no fim) / Values of the original export (with the trailing spaces)
+
+CITY_CODES = ['INDO', 'BANG', 'COIMB', 'CHEN', 'HYD', 'RANCHI', 'MYS', 'DEH', 'KOC', 'PUNE', 'LUDH',
+              'KNP', 'MUM', 'KOL', 'JAP', 'SUR', 'GOA', 'AURG', 'AGR', 'VAD', 'ALH', 'BHP']
+
+WEATHER = ['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms', 'conditions Cloudy',
+           'conditions Fog', 'conditions Windy', 'conditions NaN']
+
+TRAFFIC = ['High ', 'Jam ', 'Low ', 'Medium ']
+
+ORDER_TYPES = ['Snack ', 'Drinks ', 'Buffet ', 'Meal ']
+
+VEHICLES = ['motorcycle ', 'scooter ', 'electric_scooter ', 'bicycle ']
+
+CITIES = ['Metropolitian ', 'Urban ', 'Semi-Urban ']
+
+FIRST_DATE = pd.Timestamp( '2022-02-11' )
+
+DAYS = 55
+
+# Fração de 'NaN ' nas colunas que têm valores faltantes / Share of 'NaN ' in the columns with missing values
+MISSING = 0.03
+
+#====================================================================
+# Functions
+
+def synthetic_orders(rows, seed=0):
+    """Raw orders as read_csv returns them from train.csv
+
+        Input: rows: number of orders
+               seed: seed of the random generator
+        Output: Dataframe with the train.csv columns, including the 'NaN ',
+                'conditions X' and '(min) N' encodings
+    """
+    rng = np.random.default_rng( seed )
+
+    def choice(values, missing=0.0):
+        column = np.asarray( values, dtype=object )[rng.integers( 0, len( values ), rows )]
+        if missing:
+            column[rng.random( rows ) < missing] = 'NaN '
+        return column
+
+    deliverers = [f'{code}RES{restaurant:02d}DEL0{number} ' for code in CITY_CODES for restaurant in range( 1, 21 ) for number in ( 1, 2, 3 )]
+    latitude = rng.uniform( 9, 31, rows )
+    longitude = rng.uniform( 72, 88, rows )
+    days = pd.to_timedelta( rng.integers( 0, DAYS, rows ), unit='D' )
+
+    df = pd.DataFrame( { 'ID': np.char.add( '0x', np.char.mod( '%05x ', np.arange( rows ) ) ).astype( object ),
+                         'Delivery_person_ID': choice( deliverers ),
+                         'Delivery_person_Age': choice( np.arange( 15, 51 ).astype( str ), MISSING ),
+                         'Delivery_person_Ratings': choice( np.round( np.arange( 25, 51 ) / 10, 1 ).astype( str ), MISSING ),
+                         'Restaurant_latitude': np.round( latitude, 6 ),
+                         'Restaurant_longitude': np.round( longitude, 6 ),
+                         'Delivery_location_latitude': np.round( latitude + rng.uniform( 0, 0.2, rows ), 6 ),
+                         'Delivery_location_longitude': np.round( longitude + rng.uniform( 0, 0.2, rows ), 6 ),
+                         'Order_Date': ( FIRST_DATE + days ).strftime( '%d-%m-%Y' ),
+                         'Time_Orderd': choice( [f'{hour:02d}:{minute:02d}:00' for hour in range( 8, 24 ) for minute in ( 0, 15, 30, 45 )], MISSING ),
+                         'Time_Order_picked': choice( [f'{hour:02d}:{minute:02d}:00' for hour in range( 8, 24 ) for minute in ( 5, 20, 35, 50 )] ),
+                         'Weatherconditions': choice( WEATHER ),
+                         'Road_traffic_density': choice( TRAFFIC, MISSING ),
+                         'Vehicle_condition': rng.integers( 0, 4, rows ),
+                         'Type_of_order': choice( ORDER_TYPES ),
+                         'Type_of_vehicle': choice( VEHICLES ),
+                         'multiple_deliveries': choice( ['0', '1', '2', '3'], MISSING ),
+                         'Festival': choice( ['No '] * 19 + ['Yes '], MISSING / 3 ),
+                         'City': choice( CITIES, MISSING ),
+                         'Time_taken(min)': choice( [f'(min) {minutes}' for minutes in range( 10, 55 )] ) } )
+
+    # No export a nota falta junto com a idade / In the export the rating is missing together with the age
+    df.loc[df['Delivery_person_Age'] == 'NaN ', 'Delivery_person_Ratings'] = 'NaN '
+
+    return df
+
+#====================================================================
+
+if __name__ == '__main__':
+    synthetic_orders( int( sys.argv[1] ) ).to_csv( sys.argv[2], index=False )
@@ -0,0 +1,6 @@
+# Métricas do dashboard sem dependência de interface / Dashboard metrics with no UI dependency
+from metrics.source import clear_slice_cache, cube_filters, filtered, ignored_filters
+from metrics.company import (clear_growth_cache, delivery_density, order_growth, orders_by_city_traffic, orders_by_day,
+                             orders_by_traffic, orders_by_week, orders_per_deliverer_by_week, traffic_centers)
+from metrics.deliverers import TIME_METRICS, DelivererExtremes, deliverer_extremes, ratings_by, ratings_per_deliverer, top_deliverers
+from metrics.restaurants import average_distance, delivery_time_stats, distance_by_city, festival_time, unique_deliverers
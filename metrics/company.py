@@ -0,0 +1,102 @@
+# Libraries
+from metrics.source import filtered
+from utils.cube import rollup, rollup_locations
+from utils.figure_cache import FIGURE_CACHE_TTL, LRUCache
+from utils.filters import FilterSpec
+from utils.instrumentation import register_counters, traced
+from utils.timeseries import growth
+
+#====================================================================
+# Company metrics / Métricas da empresa
+#
+# Input of every metric: aggregates (utils.streaming.Aggregates) and
+# filters (utils.filters.FilterSpec, None keeps every order).
+
+GROWTH_CACHE_ENTRIES = 32
+
+#====================================================================
+# Functions
+
+_growth = LRUCache( GROWTH_CACHE_ENTRIES, ttl=FIGURE_CACHE_TTL )
+register_counters( 'growth_cache', _growth.stats )
+
+@traced( 'metric' )
+def order_growth(aggregates, filters=None):
+    """Daily and ISO-week series of orders and active deliverers, with rolling
+        7/28-day windows and week-over-week growth (utils.timeseries.growth)
+
+        Kept per filter spec for the data version.
+
+        Output: utils.timeseries.Growth (shared: do not modify the frames)
+    """
+    filters = filters or FilterSpec()
+
+    return _growth.get_or_build( filters, aggregates, lambda: growth( filtered( aggregates, filters ) ) )
+
+def clear_growth_cache():
+    """Drop every cached growth series"""
+    _growth.clear()
+
+@traced( 'metric' )
+def orders_by_day(aggregates, filters=None):
+    """Orders per day
+
+        Output: Dataframe with Order_Date and orders
+    """
+    return rollup( filtered( aggregates, filters ), ['Order_Date'] ).loc[: , ['Order_Date', 'orders']]
+
+@traced( 'metric' )
+def orders_by_traffic(aggregates, filters=None):
+    """Orders and share of the orders per traffic density
+
+        Output: Dataframe with Road_traffic_density, orders and share (0 to 1)
+    """
+    df_aux = rollup( filtered( aggregates, filters ), ['Road_traffic_density'] ).loc[: , ['Road_traffic_density', 'orders']]
+    df_aux = df_aux.loc[df_aux['Road_traffic_density'] != 'NaN ', : ]
+    df_aux['share'] = df_aux['orders'] / df_aux['orders'].sum()
+
+    return df_aux
+
+@traced( 'metric' )
+def orders_by_city_traffic(aggregates, filters=None):
+    """Orders per city and traffic density
+
+        Output: Dataframe with City, Road_traffic_density and orders
+    """
+    return rollup( filtered( aggregates, filters ), ['City', 'Road_traffic_density'] ).loc[: , ['City', 'Road_traffic_density', 'orders']]
+
+@traced( 'metric' )
+def orders_by_week(aggregates, filters=None):
+    """Orders per ISO week
+
+        Output: Dataframe with iso_week, week ('YYYY-Www'), orders and orders_wow
+    """
+    return order_growth( aggregates, filters ).weekly.loc[: , ['iso_week', 'week', 'orders', 'orders_wow']]
+
+@traced( 'metric' )
+def orders_per_deliverer_by_week(aggregates, filters=None):
+    """Orders per active (distinct) deliverer for every ISO week
+
+        Output: Dataframe with iso_week, week, orders, deliverers and order_by_deliver
+    """
+    df_aux = order_growth( aggregates, filters ).weekly.loc[: , ['iso_week', 'week', 'orders', 'deliverers', 'orders_per_deliverer']]
+
+    return df_aux.rename( columns={'orders_per_deliverer': 'order_by_deliver'} )
+
+@traced( 'metric' )
+def traffic_centers(aggregates, filters=None):
+    """Mean delivery location per city and traffic density
+
+        Output: Dataframe with City, Road_traffic_density, latitude_mean and longitude_mean
+    """
+    cols = ['City', 'Road_traffic_density', 'latitude_mean', 'longitude_mean']
+
+    return rollup( filtered( aggregates, filters ), ['City', 'Road_traffic_density'] ).loc[: , cols]
+
+@traced( 'metric' )
+def delivery_density(aggregates, filters=None):
+    """Orders per map grid cell of the delivery location (follows the date filter only)
+
+        Output: Dataframe with cell_lat, cell_lon and orders (utils.cube.rollup_locations)
+    """
+    return rollup_locations( filtered( aggregates, filters, 'locations' ) )
@@ -0,0 +1,82 @@
+# Libraries
+from collections import namedtuple
+from metrics.source import filtered, ignored_filters
+from utils.cube import rollup, rollup_deliveries, rollup_profiles
+from utils.instrumentation import traced
+from utils.ranking import top_k
+
+#====================================================================
+# Deliverer metrics / Métricas dos entregadores
+#
+# Input of every metric: aggregates (utils.streaming.Aggregates) and
+# filters (utils.filters.FilterSpec, None keeps every order). The metrics per
+# deliverer come from the daily profiles when only the date and city filters
+# are set, and from the delivery table (one row per order) when a filter the
+# profiles do not have is set or the exact p90 is needed.
+
+# Métricas de tempo aceitas pelo ranking / Time metrics accepted by the ranking
+TIME_METRICS = ( 'time_max', 'time_mean', 'time_p90' )
+
+# Idade e condição do veículo extremas da seleção / Extreme age and vehicle condition of the selection
+DelivererExtremes = namedtuple( 'DelivererExtremes', ['oldest', 'youngest', 'best_vehicle', 'worst_vehicle'] )
+
+#====================================================================
+# Functions
+
+@traced( 'metric' )
+def deliverer_extremes(aggregates, filters=None):
+    """Oldest and youngest deliverer, best and worst vehicle condition
+
+        Output: DelivererExtremes
+    """
+    cube = filtered( aggregates, filters )
+
+    return DelivererExtremes( oldest=cube['age_max'].max(),
+                              youngest=cube['age_min'].min(),
+                              best_vehicle=cube['vehicle_max'].max(),
+                              worst_vehicle=cube['vehicle_min'].min() )
+
+@traced( 'metric' )
+def ratings_per_deliverer(aggregates, filters=None):
+    """Mean rating of every deliverer
+
+        Output: Dataframe with Delivery_person_ID and rating_mean
+    """
+    if ignored_filters( filters, 'profiles' ):
+        stats = rollup_deliveries( filtered( aggregates, filters, 'deliveries' ) )
+    else:
+        stats = rollup_profiles( filtered( aggregates, filters, 'profiles' ) )
+
+    return stats.loc[: , ['Delivery_person_ID', 'rating_mean']]
+
+@traced( 'metric' )
+def ratings_by(aggregates, filters=None, column='Road_traffic_density'):
+    """Mean and standard deviation of the ratings per value of a cube dimension
+
+        Input: column: dimension of the order cube, e.g. 'Weatherconditions'
+        Output: Dataframe indexed by column with rating_mean and rating_std
+    """
+    return rollup( filtered( aggregates, filters ), [column] ).set_index( column ).loc[: , ['rating_mean', 'rating_std']]
+
+@traced( 'metric' )
+def top_deliverers(aggregates, filters=None, k=10, metric='time_max'):
+    """Fastest and slowest deliverers of every city by a delivery time metric
+
+        The p90 is the exact nearest-rank value of the deliverer's orders.
+
+        Input: k: number of deliverers per city
+               metric: one of TIME_METRICS
+        Output: (fastest, slowest) Dataframes with City, Delivery_person_ID and metric
+    """
+    if metric not in TIME_METRICS:
+        raise ValueError( f'unknown metric {metric!r}, expected one of {TIME_METRICS}' )
+
+    # Estatísticas calculadas uma vez por entregador / Statistics computed once per deliverer
+    if metric == 'time_p90' or ignored_filters( filters, 'profiles' ):
+        # O histograma dos perfis só daria o p90 aproximado / The histogram of the profiles would only give an approximate p90
+        stats = rollup_deliveries( filtered( aggregates, filters, 'deliveries' ), ['City', 'Delivery_person_ID'],
+                                   percentile=0.9 if metric == 'time_p90' else None )
+    else:
+        stats = rollup_profiles( filtered( aggregates, filters, 'profiles' ), ['City', 'Delivery_person_ID'] )
+
+    return top_k( stats, k, metric, by='City' )
@@ -0,0 +1,71 @@
+# Libraries
+from metrics.source import filtered
+from utils.cube import distinct_deliverers, rollup, time_summary
+from utils.figure_cache import FIGURE_CACHE_TTL, LRUCache
+from utils.filters import FilterSpec
+from utils.instrumentation import register_counters, traced
+
+#====================================================================
+# Restaurant metrics / Métricas dos restaurantes
+#
+# Input of every metric: aggregates (utils.streaming.Aggregates) and
+# filters (utils.filters.FilterSpec, None keeps every order).
+
+# Agrupamentos do tempo de entrega usados na página / Delivery time groupings used on the page
+TIME_GROUPINGS = [['Festival'], ['City'], ['City', 'Road_traffic_density']]
+
+TIME_STATS_CACHE_ENTRIES = 32
+
+#====================================================================
+# Functions
+
+_time_stats = LRUCache( TIME_STATS_CACHE_ENTRIES, ttl=FIGURE_CACHE_TTL )
+register_counters( 'time_stats_cache', _time_stats.stats )
+
+@traced( 'metric' )
+def unique_deliverers(aggregates, filters=None):
+    """Number of distinct deliverers (utils.sketch)"""
+    return distinct_deliverers( filtered( aggregates, filters ) )
+
+@traced( 'metric' )
+def average_distance(aggregates, filters=None):
+    """Mean distance between restaurant and delivery location, in km"""
+    cube = filtered( aggregates, filters )
+
+    return cube['distance_sum'].sum() / cube['orders'].sum()
+
+@traced( 'metric' )
+def distance_by_city(aggregates, filters=None):
+    """Mean delivery distance per city
+
+        Output: Dataframe with City and distance_mean
+    """
+    return rollup( filtered( aggregates, filters ), ['City'] ).loc[: , ['City', 'distance_mean']]
+
+@traced( 'metric' )
+def delivery_time_stats(aggregates, filters=None, groupings=TIME_GROUPINGS):
+    """Count, mean, std, extremes and percentiles of the delivery time, in one pass
+
+        Kept per filter spec and groupings for the data version, so the tiles,
+        charts and table of a page share one computation.
+
+        Input: groupings: list of lists of columns
+        Output: dict tuple(columns) -> Dataframe (utils.cube.time_summary; shared: do not modify the frames)
+    """
+    filters = filters or FilterSpec()
+    key = ( filters, tuple( tuple( columns ) for columns in groupings ) )
+
+    return _time_stats.get_or_build( key, aggregates, lambda: time_summary( filtered( aggregates, filters ), groupings ) )
+
+def festival_time(time_stats, festival, stat):
+    """One delivery time statistic of the orders in or out of festivals
+
+        Input: time_stats: output of delivery_time_stats
+               festival: 'Yes' or 'No'
+               stat: column of the statistics, e.g. 'time_mean' or 'time_std'
+        Output: float, or None when no order of the group is selected
+    """
+    df_aux = time_stats[( 'Festival', )]
+    values = df_aux.loc[df_aux['Festival'] == festival, stat].to_numpy()
+
+    return float( values[0] ) if len( values ) and values[0] == values[0] else None
@@ -0,0 +1,72 @@
+# Libraries
+from utils.cube import CUBE_DIMENSIONS, LOCATION_DIMENSIONS, PROFILE_DIMENSIONS
+from utils.figure_cache import FIGURE_CACHE_TTL, LRUCache
+from utils.filters import FILTER_DIMENSIONS, FilterSpec, apply_filters
+from utils.instrumentation import register_counters
+
+#====================================================================
+# Data source of the metrics / Fonte de dados das métricas
+#
+# Every metric is a plain function of (aggregates, filters): the cubes of
+# utils.loader.load_aggregates and a utils.filters.FilterSpec. Nothing in
+# this package imports streamlit, so batch jobs, benchmarks and profilers
+# call the same functions the pages render. The slices of the cubes are
+# kept per filter spec, so the metrics of a page share them.
+
+SLICE_CACHE_ENTRIES = 32
+
+SLICE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Cubo de Aggregates -> dimensões (os filtros de outras dimensões não se aplicam)
+# Cube of Aggregates -> dimensions (filters on other dimensions do not apply)
+CUBES = { 'cube': CUBE_DIMENSIONS,
+          'locations': LOCATION_DIMENSIONS,
+          'profiles': PROFILE_DIMENSIONS,
+          'deliveries': CUBE_DIMENSIONS }
+
+#====================================================================
+# Functions
+
+_slices = LRUCache( SLICE_CACHE_ENTRIES, SLICE_CACHE_BYTES, FIGURE_CACHE_TTL )
+register_counters( 'slice_cache', _slices.stats )
+
+def _frame_size(df):
+    return int( df.memory_usage( index=True ).sum() )
+
+def _check_cube(cube):
+    if cube not in CUBES:
+        raise ValueError( f'unknown cube {cube!r}, expected one of {tuple( CUBES )}' )
+
+def cube_filters(filters=None, cube='cube'):
+    """The part of a filter spec a cube answers (the other fields set to None)
+
+        Slices and cached results keyed on it are shared by the selections
+        that only differ on filters the cube does not have.
+    """
+    _check_cube( cube )
+    filters = filters or FilterSpec()
+
+    return filters._replace( **{ field: None for field, col in FILTER_DIMENSIONS.items() if col not in CUBES[cube] } )
+
+def ignored_filters(filters=None, cube='cube'):
+    """Fields of the filter spec that are set but not answered by a cube"""
+    _check_cube( cube )
+    filters = filters or FilterSpec()
+
+    return [field for field, col in FILTER_DIMENSIONS.items() if getattr( filters, field ) is not None and col not in CUBES[cube]]
+
+def filtered(aggregates, filters=None, cube='cube'):
+    """Cells of one cube selected by a filter spec, kept for the next metrics
+
+        Input: aggregates: utils.streaming.Aggregates
+               filters: FilterSpec (None keeps every cell)
+               cube: 'cube', 'locations', 'profiles' or 'deliveries'
+        Output: Dataframe (shared: do not modify it)
+    """
+    filters = cube_filters( filters, cube )
+
+    return _slices.get_or_build( ( cube, filters ), aggregates, lambda: apply_filters( getattr( aggregates, cube ), filters ), _frame_size )
+
+def clear_slice_cache():
+    """Drop every cached slice"""
+    _slices.clear()
@@ -1,129 +1,97 @@
 # Libraries
-import re
-import pandas as pd
-import haversine as haversine
+import numpy as np
 import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as st
-from datetime import datetime
 from PIL import Image
 import folium
-from streamlit_folium import folium_static
-
-#Import dataset
-df_raw = pd.read_csv("dataset/train.csv", encoding="utf-8")
-
-# Fazer uma cópia do DF lido / Make a copy of dataframe
-df = df_raw.copy()
+import streamlit.components.v1 as components
+from metrics.company import (delivery_density, order_growth, orders_by_city_traffic, orders_by_day, orders_by_traffic,
+                             orders_by_week, orders_per_deliverer_by_week, traffic_centers)
+from metrics.source import cube_filters, filtered, ignored_filters
+from utils.figure_cache import cached_figure
+from utils.instrumentation import begin_render, debug_panel, end_render, traced
+from utils.loader import load_aggregates
+from utils.refresh import start_refresher
+from utils.maps import cached_map_html, grid_map
+from utils.sidebar import data_freshness, sidebar_filters, stop_if_empty
 
 #====================================================================
 # Functions
-def country_maps(df):
-    df_aux = df.loc[: , ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude'] ].groupby(['City', 'Road_traffic_density']).median().reset_index()
+# Cálculos em metrics.company; aqui só as figuras / Computations in metrics.company; only the figures here
+@traced( 'chart' )
+def country_maps(df_aux):
+    # Posição média das entregas por cidade e tráfego / Mean delivery location per city and traffic
     map = folium.Map()
 
     for index, location_info in df_aux.iterrows():
-        folium.Marker( [location_info['Delivery_location_latitude'],
-                    location_info['Delivery_location_longitude']],
+        folium.Marker( [location_info['latitude_mean'],
+                    location_info['longitude_mean']],
                     popup=location_info[['City', 'Road_traffic_density']] ).add_to( map )
 
-    folium_static( map, width=1024, height=600)
-
-def order_share_by_week(df):
-    df_aux1 = df.loc[: , ['ID', 'week_of_year']].groupby('week_of_year').count().reset_index()
-    df_aux2 = df.loc[: , ['Delivery_person_ID', 'week_of_year']].groupby('week_of_year').nunique().reset_index()
-    df_aux = pd.merge( df_aux1, df_aux2, how='inner')
-    df_aux['order_by_deliver'] = df_aux['ID'] / df_aux['Delivery_person_ID']
-    fig = px.line( df_aux, x='week_of_year', y='order_by_deliver')
+    return map
 
-    return fig
-
-def order_by_week(df):        
-    # criar coluna semana / Create Week Column
-    df['week_of_year'] = df['Order_Date'].dt.strftime( '%U')
-    df_aux = df.loc[: , ['ID', 'week_of_year']].groupby( 'week_of_year').count().reset_index()
-    fig = px.line(df_aux, x='week_of_year', y='ID')
+@traced( 'chart' )
+def delivery_density_map(cells):
+    # Células agregadas no servidor / Cells aggregated on the server
+    return grid_map( cells )
 
-    return fig
+@traced( 'chart' )
+def order_share_by_week(df_aux):
+    fig = px.line( df_aux, x='week', y='order_by_deliver')
 
-def traffic_order_city(df):
-    df_aux = df.loc[: , ['ID', 'City', 'Road_traffic_density']].groupby(['City', 'Road_traffic_density']).count().reset_index()
-    
-    fig = px.scatter( df_aux, x='City', y='Road_traffic_density', size='ID', color='City')
-                
     return fig
 
-def traffic_order_share(df):
-    df_aux = df.loc[: , ['ID', 'Road_traffic_density']].groupby('Road_traffic_density').count().reset_index()
-    df_aux = df_aux.loc[df_aux['Road_traffic_density'] != 'NaN ', : ]
-    df_aux['entregas_perc'] = df_aux['ID'] / df_aux['ID'].sum()
-
-    fig = px.pie( df_aux, values='entregas_perc', names='Road_traffic_density')
+@traced( 'chart' )
+def order_by_week(df_aux):
+    fig = px.line(df_aux.rename( columns={'orders': 'ID'} ), x='week', y='ID')
 
     return fig
 
-def order_metric(df):
-    cols = ['ID', 'Order_Date']
-    df_aux = df.loc[: , cols].groupby('Order_Date').count().reset_index()
-    fig = px.bar( df_aux, x='Order_Date', y='ID')
+@traced( 'chart' )
+def week_over_week(weekly):
+    # Crescimento semana a semana em % (semanas parciais marcadas) / Week-over-week growth in % (partial weeks flagged)
+    df_aux = weekly.assign( growth_perc=100 * weekly['orders_wow'],
+                            week_type=np.where( weekly['days'] < 7, 'Partial week', 'Full week' ) )
+    fig = px.bar( df_aux, x='week', y='growth_perc', color='week_type', hover_data=['orders', 'deliverers_wow'] )
 
     return fig
 
-def clean_code(df):
-    """This function has the responsibility of cleaning the dataframe
-
-        Input: Dataframe
-        Output: Dataframe
-    """
-    # Excluir linhas com idade dos entregadores vazia / Delete empty rows in age column
-    linhas_vazias = df['Delivery_person_Age'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # Excluir NaN no Road Traffic / Delete 'NaN' in Road Traffic
-    linhas_vazias = df['Road_traffic_density'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # Excluir NaN no City / Delete 'NaN' in City
-    linhas_vazias = df['City'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # Excluir NaN no Festival / Delete 'NaN' in Festival
-    linhas_vazias = df['Festival'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
+@traced( 'chart' )
+def rolling_orders(daily):
+    # Pedidos nas janelas móveis de 7 e 28 dias / Orders over the rolling 7 and 28-day windows
+    df_aux = daily.reset_index().loc[: , ['Order_Date', 'orders_7d', 'orders_28d']]
+    fig = px.line( df_aux, x='Order_Date', y=['orders_7d', 'orders_28d'] )
 
-    # Conversão de texto/categora/string para numeros inteiros / Convert strings to int
-    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype(int)
+    return fig
 
-    # Conversão de texto para numeros decimais / Convert text to float
-    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype(float)
+@traced( 'chart' )
+def traffic_order_city(df_aux):
+    fig = px.scatter( df_aux.rename( columns={'orders': 'ID'} ), x='City', y='Road_traffic_density', size='ID', color='City')
+                
+    return fig
 
-    # Conversão de texto para data / Convert text to date format
-    df['Order_Date'] = pd.to_datetime( df['Order_Date'], format = '%d-%m-%Y')
+@traced( 'chart' )
+def traffic_order_share(df_aux):
+    fig = px.pie( df_aux.rename( columns={'share': 'entregas_perc'} ), values='entregas_perc', names='Road_traffic_density')
 
-    # Remove as linhas da coluna multiple_deliveries que tenham o conteudo igual a 'NaN ' / Delete 'NaN' in Multiple Deliveries
-    linhas_vazias = df['multiple_deliveries'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-    df['multiple_deliveries'] = df['multiple_deliveries'].astype(int)
+    return fig
 
-    # Remover espaço da string / Remove space from strings (trim)
-    df.loc[:, 'ID'] = df.loc[:, 'ID'].str.strip()
-    df.loc[:, 'Delivery_person_ID'] = df.loc[:, 'Delivery_person_ID'].str.strip()
-    df.loc[:, 'Road_traffic_density'] = df.loc[:, 'Road_traffic_density'].str.strip()
-    df.loc[:, 'Type_of_order'] = df.loc[:, 'Type_of_order'].str.strip()
-    df.loc[:, 'Type_of_vehicle'] = df.loc[:, 'Type_of_vehicle'].str.strip()
-    df.loc[:, 'City'] = df.loc[:, 'City'].str.strip()
-    df.loc[:, 'Festival'] = df.loc[:, 'Festival'].str.strip()
+@traced( 'chart' )
+def order_metric(df_aux):
+    fig = px.bar( df_aux.rename( columns={'orders': 'ID'} ), x='Order_Date', y='ID')
 
-    # Comando para remover o texto de numeros / Remove text from numbers
-    df.loc[: , 'Time_taken(min)'] = df['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1])
-    df.loc[: , 'Time_taken(min)'] = df.loc[: , 'Time_taken(min)'].astype( int )
+    return fig
 
-    return df
 #====================================================================
 #------------------- Beginning of code's logical structure-----------------------
 
-# Limpeza de dados / Data Cleaning
-df = clean_code( df )
+# Tempos de cada etapa desta execução (CURRY_TRACE=1) / Timings of each stage of this rerun (CURRY_TRACE=1)
+begin_render( 'company' )
+
+# Cubos agregados do dataset (cache por processo) / Aggregate cubes of the dataset (process-wide cache)
+# Atualiza os cubos em segundo plano quando o csv muda / Refresh the cubes in the background when the csv changes
+start_refresher()
+aggregates = load_aggregates()
 
 #=============================================================================
 
@@ -139,58 +107,29 @@ st.sidebar.markdown( '# Curry Company' )
 st.sidebar.markdown( '## Fastest Delivery in Town' )
 st.sidebar.markdown( """---""" )
 
-st.sidebar.markdown( '## Select a Limit Date')
-
-#============================================================================
-#Date Slider
-
-date_slider = st.sidebar.slider ( 'Until which date?' ,
-                                     value= datetime( 2022, 3, 13),
-                                     min_value= datetime(2022, 2, 11),
-                                     max_value= datetime(2022, 4, 6),
-                                     format='DD-MM-YYYY' )
-
 #============================================================================
+# Filtros de data, tráfego, clima, cidade, festival e veículo / Date, traffic, weather, city, festival and vehicle filters
+# O FilterSpec também é a chave das figuras em cache / The FilterSpec is also the key of the cached figures
+filters = sidebar_filters( aggregates.cube )
 
-#Multiselect Traffic Conditions
-
-st.sidebar.markdown( '## Select desired Traffic Conditions')
-traffic_options = st.sidebar.multiselect('', ['Low', 'Medium', 'High', 'Jam'], default=['Low', 'Medium', 'High', 'Jam'])
+stop_if_empty( filtered( aggregates, filters ) )
 
 st.sidebar.markdown("""---""")
 
-#============================================================================
-#Multiselect Weather Conditions
-
-st.sidebar.markdown( '## Select desired Weather Conditions')
-weather_options = df['Weatherconditions'].unique()
-st.sidebar.multiselect( '', weather_options, default=weather_options)
-
-#============================================================================
-## Date Filter
-selected_lines = df['Order_Date'] < date_slider
-df = df.loc[selected_lines , :]
-
-st.sidebar.markdown("""---""")
-
-## Traffic density Filter
-selected_lines = df['Road_traffic_density'].isin (traffic_options)
-df = df.loc[selected_lines, :]
-
-## Weather conditions Filter
-selected_lines = df['Weatherconditions'].isin(weather_options)
-df = df.loc[selected_lines , :]
-
 st.sidebar.markdown("### Powered by Gabriel Junqueira")
 
+data_freshness()
+
 #==============================================================================================
 #Main Layout
-tab1, tab2, tab3 = st.tabs( ['Managerial View', 'Tactical View', 'Geographic View'] )
+# Só a visão escolhida é calculada (st.tabs calcularia as três) / Only the selected view is computed (st.tabs would compute all three)
+VIEWS = ['Managerial View', 'Tactical View', 'Geographic View']
+view = st.radio( 'View', VIEWS, horizontal=True, label_visibility='collapsed', key='company_view' )
 
-with tab1:
+if view == 'Managerial View':
     with st.container():
         #Order Metric
-        fig = order_metric(df)
+        fig = cached_figure( 'order_metric', aggregates, filters, lambda: order_metric( orders_by_day( aggregates, filters ) ) )
         st.markdown("<p style= 'text-align: center; font-weight: bold; font-size: 30px;'>Orders by Day</p>", unsafe_allow_html=True)       
         st.plotly_chart( fig , use_container_width=True)
      
@@ -198,28 +137,58 @@ with tab1:
         col1, col2 = st.columns( 2 )
 
         with col1:
-            fig = traffic_order_share(df)
+            fig = cached_figure( 'traffic_order_share', aggregates, filters, lambda: traffic_order_share( orders_by_traffic( aggregates, filters ) ) )
             st.markdown("<p style= 'text-align: center; font-weight: bold; font-size: 30px;'>Orders - Traffic Density</p>", unsafe_allow_html=True)
             st.plotly_chart( fig , use_container_width=True)
           
         with col2:
-            fig = traffic_order_city(df)
+            fig = cached_figure( 'traffic_order_city', aggregates, filters, lambda: traffic_order_city( orders_by_city_traffic( aggregates, filters ) ) )
             st.markdown("<p style= 'text-align: center; font-weight: bold; font-size: 30px;'>Orders - City and Traffic</p>", unsafe_allow_html=True)
             st.plotly_chart( fig, use_container_width=True)
 
-with tab2:
+elif view == 'Tactical View':
     with st.container():
         st.markdown("<p style= 'text-align: center; font-weight: bold; font-size: 30px;'>Orders by Week</p>", unsafe_allow_html=True)
-        fig = order_by_week(df)
+        fig = cached_figure( 'order_by_week', aggregates, filters, lambda: order_by_week( orders_by_week( aggregates, filters ) ) )
         st.plotly_chart( fig, use_container_width=True)
 
     st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True) # Add space between containers
 
     with st.container():
-        fig = order_share_by_week(df)
+        fig = cached_figure( 'order_share_by_week', aggregates, filters, lambda: order_share_by_week( orders_per_deliverer_by_week( aggregates, filters ) ) )
         st.markdown("<p style= 'text-align: center; font-weight: bold; font-size: 30px;'>Order Deliveres by Week</p>", unsafe_allow_html=True)
         st.plotly_chart( fig, use_container_width=True)
 
-with tab3:
+    # Crescimento: uma série temporal por estado dos filtros / Growth: one time series per filter state
+    with st.container():
+        col1, col2 = st.columns( 2 )
+
+        with col1:
+            fig = cached_figure( 'week_over_week', aggregates, filters, lambda: week_over_week( order_growth( aggregates, filters ).weekly ) )
+            st.markdown("<p style= 'text-align: center; font-weight: bold; font-size: 30px;'>Week-over-Week Growth (%)</p>", unsafe_allow_html=True)
+            st.plotly_chart( fig, use_container_width=True)
+
+        with col2:
+            fig = cached_figure( 'rolling_orders', aggregates, filters, lambda: rolling_orders( order_growth( aggregates, filters ).daily ) )
+            st.markdown("<p style= 'text-align: center; font-weight: bold; font-size: 30px;'>Rolling Orders - 7 and 28 Days</p>", unsafe_allow_html=True)
+            st.plotly_chart( fig, use_container_width=True)
+
+elif view == 'Geographic View':
     st.markdown("<p style= 'text-align: center; font-weight: bold; font-size: 30px;'>Country Map</p>", unsafe_allow_html=True)
-    country_maps(df)
\ No newline at end of file
+    map_mode = st.radio( 'Map', ['City and Traffic Centers', 'Delivery Density'], horizontal=True, label_visibility='collapsed' )
+
+    # html do mapa guardado por modo e filtros / Map html kept per mode and filters
+    if map_mode == 'Delivery Density':
+        html = cached_map_html( ( 'density', cube_filters( filters, 'locations' ) ), aggregates, lambda: delivery_density_map( delivery_density( aggregates, filters ) ) )
+    else:
+        html = cached_map_html( ( 'markers', filters ), aggregates, lambda: country_maps( traffic_centers( aggregates, filters ) ) )
+
+    components.html( html, width=1024, height=610 )
+
+    ignored = ignored_filters( filters, 'locations' ) if map_mode == 'Delivery Density' else []
+    if ignored:
+        st.caption( f"The delivery density follows the date filter only ({', '.join( ignored )} not applied)." )
+
+#==============================================================================================
+# Painel de depuração (só com CURRY_TRACE=1) / Debug panel (only with CURRY_TRACE=1)
+debug_panel( end_render() )
\ No newline at end of file
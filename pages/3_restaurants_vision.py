@@ -1,33 +1,34 @@
 # Libraries
-import re
-import pandas as pd
 import numpy as np
-from haversine import haversine
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
-from datetime import datetime
 from PIL import Image
-import folium
-from streamlit_folium import folium_static
+from metrics.restaurants import average_distance, delivery_time_stats, distance_by_city, festival_time, unique_deliverers
+from metrics.source import filtered
+from utils.figure_cache import cached_figure
+from utils.instrumentation import begin_render, debug_panel, end_render, traced
+from utils.loader import load_aggregates
+from utils.refresh import start_refresher
+from utils.pagination import cached_table
+from utils.sidebar import data_freshness, sidebar_filters, stop_if_empty
+from utils.tables import paged_table
 
 #====================================================================
 # Functions
 
-def avg_std_time_on_traffic(df):
-    df_aux = df.loc[ : , ['City', 'Time_taken(min)', 'Road_traffic_density']].groupby(['City' , 'Road_traffic_density']).agg( {'Time_taken(min)' : ['mean', 'std']} )
-    df_aux.columns = ['avg_time', 'std_time']
-    df_aux = df_aux.reset_index()
+@traced( 'chart' )
+def avg_std_time_on_traffic(time_stats):
+    df_aux = time_stats[( 'City', 'Road_traffic_density' )].rename( columns={'time_mean': 'avg_time', 'time_std': 'std_time'} )
 
     fig = px.sunburst(df_aux, path=['City', 'Road_traffic_density'], values='avg_time', 
                     color='std_time', color_continuous_scale='RdBu', color_continuous_midpoint=np.average(df_aux['std_time']))
 
     return fig
             
-def avg_std_time_graph(df):
-    df_aux = df.loc[ : , ['City', 'Time_taken(min)']].groupby('City').agg( {'Time_taken(min)' : ['mean', 'std']} )
-    df_aux.columns = ['avg_time', 'std_time']
-    df_aux = df_aux.reset_index()
+@traced( 'chart' )
+def avg_std_time_graph(time_stats):
+    df_aux = time_stats[( 'City', )].rename( columns={'time_mean': 'avg_time', 'time_std': 'std_time'} )
 
     fig = go.Figure()
     fig.add_trace( go.Bar( name='Control', x=df_aux['City'], y=df_aux['avg_time'], error_y= dict(type='data', array=df_aux['std_time'])))
@@ -35,110 +36,40 @@ def avg_std_time_graph(df):
 
     return fig
 
-def avg_std_time_delivery(df , festival, op):
+@traced( 'chart' )
+def avg_std_time_delivery(time_stats , festival, op):
     """
-    This function calculates the average time and standard deviation of delivery time
+    This function formats the average time or standard deviation of delivery time
     Parameters:
-        Input: df: Dataframe with necessary data for calculation
+        Input: time_stats: output of metrics.delivery_time_stats
                 op: Operation required
                     'avg_time': Mean time
                     'std_time': Standard Deviation time
-        Output: Dataframe with 2 columns and 1 row
+        Output: value rounded to 2 decimals, or '-' when no order of the group is selected
     """
-    df_aux = df.loc[ : , ['Time_taken(min)', 'Festival']].groupby('Festival').agg( {'Time_taken(min)' : ['mean', 'std']} )
-    df_aux.columns = ['avg_time', 'std_time']
-    df_aux = df_aux.reset_index()
-
-    df_aux = np.round(df_aux.loc[df_aux['Festival'] == festival, 'avg_time'], 2).values[0]
-
-    return df_aux
-
-def distance(df , fig):
-    if fig ==False:
-        cols = ['Delivery_location_latitude', 'Delivery_location_longitude', 'Restaurant_latitude', 'Restaurant_longitude']         
-        df['distance'] = df.loc[0:10, cols].apply( lambda x:
-                                        haversine(
-                                            (x['Restaurant_latitude'], x['Restaurant_longitude']),
-                                            (x['Delivery_location_latitude'], x['Delivery_location_longitude']) ),
-                                            axis=1
-                                        )
-        average_distance = df['distance'].mean()
-        st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{round(average_distance, 2)}</h3>", unsafe_allow_html=True)
-        
-        return average_distance
-    
-    else:
-        cols = ['Delivery_location_latitude', 'Delivery_location_longitude', 'Restaurant_latitude', 'Restaurant_longitude']
-        df['distance'] = df.loc[0:10, cols].apply( lambda x:
-                                        haversine(
-                                            (x['Restaurant_latitude'], x['Restaurant_longitude']),
-                                            (x['Delivery_location_latitude'], x['Delivery_location_longitude']) ),
-                                            axis=1
-                                        )
-        average_distance = df.loc[: , ['City', 'distance']].groupby('City').mean().reset_index()
-
-        fig = go.Figure(data= [go.Pie(labels=average_distance['City'], values=average_distance['distance'], pull=[0.1, 0, 0])])
-        
-        return fig
-
-def clean_code(df):
-    """This function has the responsibility of cleaning the dataframe
-
-        Input: Dataframe
-        Output: Dataframe
-    """
-    # Excluir linhas com idade dos entregadores vazia / Delete empty rows in age column
-    linhas_vazias = df['Delivery_person_Age'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # Excluir NaN no Road Traffic / Delete 'NaN' in Road Traffic
-    linhas_vazias = df['Road_traffic_density'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # Excluir NaN no City / Delete 'NaN' in City
-    linhas_vazias = df['City'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # Excluir NaN no Festival / Delete 'NaN' in Festival
-    linhas_vazias = df['Festival'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # Conversão de texto/categora/string para numeros inteiros / Convert strings to int
-    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype(int)
-
-    # Conversão de texto para numeros decimais / Convert text to float
-    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype(float)
-
-    # Conversão de texto para data / Convert text to date format
-    df['Order_Date'] = pd.to_datetime( df['Order_Date'], format = '%d-%m-%Y')
+    value = festival_time( time_stats, festival, {'avg_time': 'time_mean', 'std_time': 'time_std'}[op] )
 
-    # Remove as linhas da coluna multiple_deliveries que tenham o conteudo igual a 'NaN ' / Delete 'NaN' in Multiple Deliveries
-    linhas_vazias = df['multiple_deliveries'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-    df['multiple_deliveries'] = df['multiple_deliveries'].astype(int)
+    return '-' if value is None else np.round( value, 2 )
 
-    # Remover espaço da string / Remove space from strings (trim)
-    df.loc[:, 'ID'] = df.loc[:, 'ID'].str.strip()
-    df.loc[:, 'Delivery_person_ID'] = df.loc[:, 'Delivery_person_ID'].str.strip()
-    df.loc[:, 'Road_traffic_density'] = df.loc[:, 'Road_traffic_density'].str.strip()
-    df.loc[:, 'Type_of_order'] = df.loc[:, 'Type_of_order'].str.strip()
-    df.loc[:, 'Type_of_vehicle'] = df.loc[:, 'Type_of_vehicle'].str.strip()
-    df.loc[:, 'City'] = df.loc[:, 'City'].str.strip()
-    df.loc[:, 'Festival'] = df.loc[:, 'Festival'].str.strip()
+@traced( 'chart' )
+def distance(df_aux):
+    # Distância média por cidade (metrics.distance_by_city) / Mean distance per city (metrics.distance_by_city)
+    average_distance = df_aux.rename( columns={'distance_mean': 'distance'} )
 
-    # Comando para remover o texto de numeros / Remove text from numbers
-    df.loc[: , 'Time_taken(min)'] = df['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1])
-    df.loc[: , 'Time_taken(min)'] = df.loc[: , 'Time_taken(min)'].astype( int )
+    fig = go.Figure(data= [go.Pie(labels=average_distance['City'], values=average_distance['distance'], pull=[0.1, 0, 0])])
 
-    return df
+    return fig
 
 #====================================================================
 
-#Import dataset
-df = pd.read_csv("dataset/train.csv", encoding="utf-8")
+# Tempos de cada etapa desta execução (CURRY_TRACE=1) / Timings of each stage of this rerun (CURRY_TRACE=1)
+begin_render( 'restaurants' )
 
-# Limpeza de dados / Data Cleaning
-df = clean_code(df)
+#Import dataset
+# Leitura e limpeza de dados (cache por processo) / Load and clean data (process-wide cache)
+# Atualiza os cubos em segundo plano quando o csv muda / Refresh the cubes in the background when the csv changes
+start_refresher()
+aggregates = load_aggregates()
 
 #=============================================================================
 
@@ -154,50 +85,19 @@ st.sidebar.markdown( '# Curry Company' )
 st.sidebar.markdown( '## Fastest Delivery in Town' )
 st.sidebar.markdown( """---""" )
 
-st.sidebar.markdown( '## Select a Limit Date')
-
-#============================================================================
-#Date Slider
-
-date_slider = st.sidebar.slider ( 'Until which date?' ,
-                                     value= datetime( 2022, 3, 13),
-                                     min_value= datetime(2022, 2, 11),
-                                     max_value= datetime(2022, 4, 6),
-                                     format='DD-MM-YYYY' )
-
 #============================================================================
+# Filtros de data, tráfego, clima, cidade, festival e veículo / Date, traffic, weather, city, festival and vehicle filters
+# O FilterSpec também é a chave das figuras em cache / The FilterSpec is also the key of the cached figures
+filters = sidebar_filters( aggregates.cube )
 
-#Multiselect Traffic Conditions
-
-st.sidebar.markdown( '## Select desired Traffic Conditions')
-traffic_options = st.sidebar.multiselect('', ['Low', 'Medium', 'High', 'Jam'], default=['Low', 'Medium', 'High', 'Jam'])
+stop_if_empty( filtered( aggregates, filters ) )
 
 st.sidebar.markdown("""---""")
 
-#============================================================================
-#Multiselect Weather Conditions
-
-st.sidebar.markdown( '## Select desired Weather Conditions')
-weather_options = df['Weatherconditions'].unique()
-st.sidebar.multiselect( '', weather_options, default=weather_options)
-
-#============================================================================
-## Date Filter
-selected_lines = df['Order_Date'] < date_slider
-df = df.loc[selected_lines , :]
-
-st.sidebar.markdown("""---""")
-
-## Traffic density Filter
-selected_lines = df['Road_traffic_density'].isin (traffic_options)
-df = df.loc[selected_lines, :]
-
-## Weather conditions Filter
-selected_lines = df['Weatherconditions'].isin(weather_options)
-df = df.loc[selected_lines , :]
-
 st.sidebar.markdown("### Powered by Gabriel Junqueira")
 
+data_freshness()
+
 #============================================================================
 # Layout
 
@@ -209,37 +109,38 @@ with tab1:
 
         with col1:
             st.markdown("<p style='text-align: center; font-weight: bold; font-size: 15px;'>Unique Deliverers</p>", unsafe_allow_html=True)
-            delivery_unique = len(df.loc[: , 'Delivery_person_ID'].unique())
+            delivery_unique = unique_deliverers( aggregates, filters )
 
             st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{delivery_unique}</h3>", unsafe_allow_html=True)
 
         with col2:
             st.markdown("<p style='text-align: center; font-weight: bold; font-size: 15px;'>Average Distance</p>", unsafe_allow_html=True)
-            average_distance = distance(df , fig=False)
+            distance_km = average_distance( aggregates, filters )
+            st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{round(distance_km, 2)}</h3>", unsafe_allow_html=True)
             
         with col3:
-            df_aux = avg_std_time_delivery( df, 'Yes', 'avg_time')           
+            df_aux = avg_std_time_delivery( delivery_time_stats( aggregates, filters ), 'Yes', 'avg_time')           
 
             st.markdown("<p style='text-align: center; font-weight: bold; font-size: 15px;'>Avg Dlv Time in Festival</p>", unsafe_allow_html=True)
-            st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{round(df_aux, 2)}</h3>", unsafe_allow_html=True)
+            st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{df_aux}</h3>", unsafe_allow_html=True)
             
         with col4:
-            df_aux = avg_std_time_delivery( df, 'Yes', 'std_time')
+            df_aux = avg_std_time_delivery( delivery_time_stats( aggregates, filters ), 'Yes', 'std_time')
 
             st.markdown("<p style='text-align: center; font-weight: bold; font-size: 15px;'>Std Dlv Time in Festival</p>", unsafe_allow_html=True)
-            st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{round(df_aux, 2)}</h3>", unsafe_allow_html=True)
+            st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{df_aux}</h3>", unsafe_allow_html=True)
             
         with col5:
-            df_aux = avg_std_time_delivery( df, 'No', 'avg_time')
+            df_aux = avg_std_time_delivery( delivery_time_stats( aggregates, filters ), 'No', 'avg_time')
 
             st.markdown("<p style='text-align: center; font-weight: bold; font-size: 15px;'>Avg Dlv Time out Festival</p>", unsafe_allow_html=True)
-            st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{round(df_aux, 2)}</h3>", unsafe_allow_html=True)
+            st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{df_aux}</h3>", unsafe_allow_html=True)
 
         with col6:
-            df_aux = avg_std_time_delivery( df, 'No', 'std_time')
+            df_aux = avg_std_time_delivery( delivery_time_stats( aggregates, filters ), 'No', 'std_time')
 
             st.markdown("<p style='text-align: center; font-weight: bold; font-size: 15px;'>Std Dlv Time out Festival</p>", unsafe_allow_html=True)
-            st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{round(df_aux, 2)}</h3>", unsafe_allow_html=True)
+            st.markdown(f"<h3 style='text-align: center; font-size: 32px;'>{df_aux}</h3>", unsafe_allow_html=True)
 
     st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True) # Add space between containers
 
@@ -249,33 +150,34 @@ with tab1:
         with col1:
             st.markdown("<p style='text-align: center; font-weight: bold; font-size: 25px;'>Time Distribution per City</p>", unsafe_allow_html=True)
 
-            fig = avg_std_time_graph(df)
+            fig = cached_figure( 'avg_std_time_graph', aggregates, filters, lambda: avg_std_time_graph( delivery_time_stats( aggregates, filters ) ) )
             st.plotly_chart( fig )
 
         with col2:
             st.markdown("<p style='text-align: center; font-weight: bold; font-size: 25px;'>Average Time per Type of Delivery</p>", unsafe_allow_html=True)
 
-            fig = avg_std_time_on_traffic(df)
+            fig = cached_figure( 'avg_std_time_on_traffic', aggregates, filters, lambda: avg_std_time_on_traffic( delivery_time_stats( aggregates, filters ) ) )
             st.plotly_chart( fig )
 
     with st.container():
         st.markdown("<p style='text-align: center; font-weight: bold; font-size: 25px;'>Distribution of Average Distance per City</p>", unsafe_allow_html=True)
 
-        fig = distance(df, fig=True)
+        fig = cached_figure( 'distance', aggregates, filters, lambda: distance( distance_by_city( aggregates, filters ) ) )
         st.plotly_chart( fig )
 
     with st.container():
         st.markdown("<p style= 'text-align: center; font-weight: bold; font-size: 25px;'>Average Delivery Time per City and Traffic </p>", unsafe_allow_html=True)
 
-        cols = ['City', 'Time_taken(min)', 'Road_traffic_density']
-        df_aux = df.loc[ : , cols].groupby(['City' , 'Road_traffic_density']).agg( {'Time_taken(min)' : ['mean', 'std']} )
-        df_aux.columns = ['avg_time', 'std_time']
-        df_aux = df_aux.reset_index()
+        cols = ['City', 'Road_traffic_density', 'orders', 'time_mean', 'time_std', 'time_p50', 'time_p90']
+        names = ['City', 'Road_traffic_density', 'orders', 'avg_time', 'std_time', 'p50_time', 'p90_time']
+
+        # Ordenação, busca por cidade e página no servidor / Sorting, city search and paging on the server
+        df_aux = cached_table( 'time_by_city_traffic', aggregates, filters,
+                               lambda: delivery_time_stats( aggregates, filters )[( 'City', 'Road_traffic_density' )].loc[ : , cols].set_axis( names, axis=1 ),
+                               search_column='City' )
 
-        df_html = df_aux.to_html(index=False)  # Remove o índice
+        paged_table( 'time_by_city_traffic', df_aux )
 
-        st.markdown(f"""
-            <div style="display: flex; justify-content: center;">
-                {df_html}
-            </div>
-        """, unsafe_allow_html=True)
\ No newline at end of file
+#==============================================================================================
+# Painel de depuração (só com CURRY_TRACE=1) / Debug panel (only with CURRY_TRACE=1)
+debug_panel( end_render() )
\ No newline at end of file
@@ -0,0 +1,101 @@
+# Libraries
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import synthetic_orders
+from utils.cleaning import clean_code
+
+#====================================================================
+# clean_code vetorizado contra a versão original das páginas
+# Vectorized clean_code against the original version of the pages
+
+DATASET_PATH = os.path.join( os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ), 'dataset', 'train.csv' )
+
+#====================================================================
+# Functions
+
+def original_clean_code(df):
+    """clean_code as the pages defined it before the vectorization (reference)
+
+        Input: Dataframe
+        Output: Dataframe
+    """
+    # Excluir linhas com idade dos entregadores vazia / Delete empty rows in age column
+    linhas_vazias = df['Delivery_person_Age'] != 'NaN '
+    df = df.loc[linhas_vazias, :]
+
+    # Excluir NaN no Road Traffic / Delete 'NaN' in Road Traffic
+    linhas_vazias = df['Road_traffic_density'] != 'NaN '
+    df = df.loc[linhas_vazias, :]
+
+    # Excluir NaN no City / Delete 'NaN' in City
+    linhas_vazias = df['City'] != 'NaN '
+    df = df.loc[linhas_vazias, :]
+
+    # Excluir NaN no Festival / Delete 'NaN' in Festival
+    linhas_vazias = df['Festival'] != 'NaN '
+    df = df.loc[linhas_vazias, :]
+
+    # Conversão de texto/categora/string para numeros inteiros / Convert strings to int
+    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype(int)
+
+    # Conversão de texto para numeros decimais / Convert text to float
+    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype(float)
+
+    # Conversão de texto para data / Convert text to date format
+    df['Order_Date'] = pd.to_datetime( df['Order_Date'], format = '%d-%m-%Y')
+
+    # Remove as linhas da coluna multiple_deliveries que tenham o conteudo igual a 'NaN ' / Delete 'NaN' in Multiple Deliveries
+    linhas_vazias = df['multiple_deliveries'] != 'NaN '
+    df = df.loc[linhas_vazias, :]
+    df['multiple_deliveries'] = df['multiple_deliveries'].astype(int)
+
+    # Remover espaço da string / Remove space from strings (trim)
+    df.loc[:, 'ID'] = df.loc[:, 'ID'].str.strip()
+    df.loc[:, 'Delivery_person_ID'] = df.loc[:, 'Delivery_person_ID'].str.strip()
+    df.loc[:, 'Road_traffic_density'] = df.loc[:, 'Road_traffic_density'].str.strip()
+    df.loc[:, 'Type_of_order'] = df.loc[:, 'Type_of_order'].str.strip()
+    df.loc[:, 'Type_of_vehicle'] = df.loc[:, 'Type_of_vehicle'].str.strip()
+    df.loc[:, 'City'] = df.loc[:, 'City'].str.strip()
+    df.loc[:, 'Festival'] = df.loc[:, 'Festival'].str.strip()
+
+    # Comando para remover o texto de numeros / Remove text from numbers
+    df.loc[: , 'Time_taken(min)'] = df['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1])
+    df.loc[: , 'Time_taken(min)'] = df.loc[: , 'Time_taken(min)'].astype( int )
+
+    return df
+
+def expected_clean(raw):
+    """Output of the original clean_code with the intended dtype change
+
+        The original assigned the parsed minutes through df.loc, so
+        Time_taken(min) stayed an object column of Python ints; the
+        vectorized version returns it as int64.
+    """
+    df = original_clean_code( raw.copy() )
+    df['Time_taken(min)'] = df['Time_taken(min)'].astype( np.int64 )
+
+    return df
+
+def assert_same_cleaning(raw):
+    df = clean_code( raw.copy() )
+
+    assert df['Time_taken(min)'].dtype == np.int64
+    pd.testing.assert_frame_equal( df, expected_clean( raw ) )
+
+@pytest.mark.skipif( not os.path.exists( DATASET_PATH ), reason='dataset/train.csv not available' )
+def test_clean_code_matches_original_on_train_csv():
+    assert_same_cleaning( pd.read_csv( DATASET_PATH, encoding="utf-8" ) )
+
+@pytest.mark.parametrize( 'rows, seed', [( 5_000, 0 ), ( 20_000, 1 )] )
+def test_clean_code_matches_original_on_synthetic_orders(rows, seed):
+    assert_same_cleaning( synthetic_orders( rows, seed=seed ) )
+
+def test_clean_code_does_not_modify_its_input():
+    raw = synthetic_orders( 1_000 )
+    before = raw.copy()
+
+    clean_code( raw )
+
+    pd.testing.assert_frame_equal( raw, before )
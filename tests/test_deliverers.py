@@ -0,0 +1,55 @@
+# Libraries
+import math
+import numpy as np
+import pytest
+from benchmarks.synthetic import synthetic_orders
+from metrics.deliverers import ratings_per_deliverer, top_deliverers
+from utils.cleaning import clean_code
+from utils.filters import FilterSpec
+from utils.geo import add_distance
+from utils.schema import apply_schema
+from utils.streaming import aggregates_from_frame
+
+#====================================================================
+# Métricas por entregador contra uma passada pelos pedidos
+# Per-deliverer metrics against a pass over the orders
+
+TIME_COLUMN = 'Time_taken(min)'
+
+#====================================================================
+# Functions
+
+@pytest.fixture( scope='module' )
+def orders():
+    df = add_distance( apply_schema( clean_code( synthetic_orders( 20_000, seed=2 ) ) ) )
+
+    return df, aggregates_from_frame( df )
+
+def nearest_rank(values, q=0.9):
+    values = np.sort( values.to_numpy() )
+
+    return values[max( 1, math.ceil( q * len( values ) ) ) - 1]
+
+@pytest.mark.parametrize( 'filters', [None, FilterSpec( traffic=( 'Low', 'Jam' ), vehicle=( 'motorcycle', ) )] )
+@pytest.mark.parametrize( 'metric', ['time_max', 'time_mean', 'time_p90'] )
+def test_top_deliverers_match_the_orders(orders, filters, metric):
+    df, aggregates = orders
+    if filters is not None:
+        df = df.loc[df['Road_traffic_density'].isin( filters.traffic ) & df['Type_of_vehicle'].isin( filters.vehicle )]
+
+    groups = df.groupby( ['City', 'Delivery_person_ID'], observed=True )[TIME_COLUMN]
+    expected = groups.agg( nearest_rank ) if metric == 'time_p90' else groups.agg( metric[len( 'time_' ):] )
+
+    for ranking in top_deliverers( aggregates, filters, 5, metric ):
+        for row in ranking.itertuples( index=False ):
+            assert getattr( row, metric ) == pytest.approx( expected[( row.City, row.Delivery_person_ID )] )
+
+def test_ratings_per_deliverer_follow_every_filter(orders):
+    df, aggregates = orders
+    filters = FilterSpec( weather=( 'conditions Sunny', ), festival=( 'Yes', ) )
+    df = df.loc[( df['Weatherconditions'] == 'conditions Sunny' ) & ( df['Festival'] == 'Yes' )]
+
+    ratings = ratings_per_deliverer( aggregates, filters ).set_index( 'Delivery_person_ID' )['rating_mean']
+    expected = df.groupby( 'Delivery_person_ID', observed=True )['Delivery_person_Ratings'].mean()
+
+    np.testing.assert_allclose( ratings.sort_index(), expected.sort_index() )
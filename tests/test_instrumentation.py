@@ -0,0 +1,36 @@
+# Libraries
+import numpy as np
+import pandas as pd
+import pytest
+from utils import instrumentation
+from utils.instrumentation import begin_render, end_render, set_enabled, traced
+
+#====================================================================
+# Spans do modo de depuração (CURRY_TRACE=1) / Spans of the debug mode (CURRY_TRACE=1)
+
+#====================================================================
+# Functions
+
+@pytest.fixture
+def tracing():
+    previous = instrumentation.enabled()
+    set_enabled( True )
+    yield
+    set_enabled( previous )
+
+@pytest.mark.parametrize( 'value', [np.float64( 1.5 ), np.round( np.float64( 31.714 ), 2 ), np.int64( 3 ), 2.5, None] )
+def test_traced_function_returning_a_scalar(tracing, value):
+    begin_render( 'test' )
+    result = traced( 'metric' )( lambda arg: value )( 3 )
+    spans = end_render()
+
+    assert result is value
+    assert spans[0].name == '<lambda>' and spans[0].rows is None
+
+def test_traced_function_counts_rows(tracing):
+    begin_render( 'test' )
+    traced( 'filter' )( lambda df: df.head( 2 ) )( pd.DataFrame( { 'a': range( 5 ) } ) )
+    traced( 'metric' )( lambda arg: np.arange( 4 ) )( 1.0 )
+    spans = end_render()
+
+    assert [span.rows for span in spans[:2]] == [5, 4]
@@ -0,0 +1,68 @@
+# Libraries
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import synthetic_orders
+from utils.cleaning import clean_code
+from utils.cube import SET_MEASURE
+from utils.geo import add_distance
+from utils.schema import apply_schema
+from utils.shared_dataset import attach_aggregates, shared_aggregates, write_aggregates
+from utils.sketch import registers_of
+from utils.streaming import aggregates_from_frame
+
+#====================================================================
+# Agregados publicados e mapeados de volta / Aggregates published and mapped back
+
+#====================================================================
+# Functions
+
+@pytest.fixture( scope='module' )
+def aggregates():
+    df = add_distance( apply_schema( clean_code( synthetic_orders( 5_000, seed=3 ) ) ) )
+    aggregates = aggregates_from_frame( df )
+
+    # Uma célula com registradores HyperLogLog além dos conjuntos exatos / One cell with HyperLogLog registers besides the exact sets
+    sketches = aggregates.cube[SET_MEASURE].to_numpy().copy()
+    sketches[0] = registers_of( np.arange( 5_000, dtype=np.uint64 ) * 0x9E3779B97F4A7C15 )
+
+    return aggregates._replace( cube=aggregates.cube.assign( **{ SET_MEASURE: sketches } ) )
+
+def assert_same_aggregates(left, right):
+    assert left.deliverer_ids == right.deliverer_ids
+
+    for field in ( 'cube', 'locations', 'profiles', 'deliveries' ):
+        expected, attached = getattr( left, field ), getattr( right, field )
+        pd.testing.assert_frame_equal( attached.drop( columns=SET_MEASURE, errors='ignore' ),
+                                       expected.drop( columns=SET_MEASURE, errors='ignore' ) )
+
+    for expected, attached in zip( left.cube[SET_MEASURE], right.cube[SET_MEASURE] ):
+        assert attached.dtype == expected.dtype and np.array_equal( attached, expected )
+
+def test_attached_aggregates_match_the_published_ones(aggregates, tmp_path):
+    attached = attach_aggregates( write_aggregates( aggregates, str( tmp_path / 'version' ) ) )
+
+    assert_same_aggregates( aggregates, attached )
+    assert not attached.cube['orders'].to_numpy().flags.writeable
+
+def test_attach_of_an_incomplete_version_returns_none(aggregates, tmp_path):
+    directory = write_aggregates( aggregates, str( tmp_path / 'version' ) )
+    ( tmp_path / 'version' / 'profiles' / 'meta.json' ).unlink()
+
+    assert attach_aggregates( directory ) is None
+    assert attach_aggregates( str( tmp_path / 'missing' ) ) is None
+
+def test_shared_aggregates_are_built_once_per_version(aggregates, tmp_path):
+    csv_path = tmp_path / 'train.csv'
+    csv_path.write_text( 'ID\n1\n' )
+    builds = []
+
+    def build():
+        builds.append( 1 )
+        return aggregates
+
+    first = shared_aggregates( str( csv_path ), build, root=str( tmp_path / 'store' ) )
+    second = shared_aggregates( str( csv_path ), build, root=str( tmp_path / 'store' ) )
+
+    assert len( builds ) == 1
+    assert_same_aggregates( first, second )
@@ -0,0 +1,34 @@
+# Libraries
+import numpy as np
+import pytest
+from utils.sketch import EMPTY_SKETCH, estimate, merge_sketches, registers_of
+
+#====================================================================
+# Estimativa HyperLogLog sem viés / Unbiased HyperLogLog estimate
+
+#====================================================================
+# Functions
+
+def random_hashes(rng, count):
+    return rng.integers( 0, 2**64, count, dtype=np.uint64 )
+
+@pytest.mark.parametrize( 'count', [3_000, 10_000, 40_000] )
+def test_estimate_has_no_bias_across_the_range(count):
+    rng = np.random.default_rng( count )
+    errors = [estimate( registers_of( random_hashes( rng, count ), precision=12 ) ) / count - 1 for _ in range( 100 )]
+
+    # Erro padrão da média: 1.6% / sqrt(100) = 0.16% / Standard error of the mean: 1.6% / sqrt(100) = 0.16%
+    assert abs( np.mean( errors ) ) < 0.006
+    assert np.std( errors ) < 0.025
+
+def test_estimate_of_small_and_empty_registers():
+    assert estimate( np.zeros( 4096, dtype=np.uint8 ) ) == 0
+    assert estimate( registers_of( np.array( [5], dtype=np.uint64 ), precision=12 ) ) == 1
+    assert estimate( EMPTY_SKETCH ) == 0
+
+def test_merged_registers_estimate_the_union():
+    rng = np.random.default_rng( 0 )
+    hashes = random_hashes( rng, 30_000 )
+    merged = merge_sketches( [registers_of( part, precision=12 ) for part in np.array_split( hashes, 3 )] )
+
+    assert estimate( merged ) == pytest.approx( 30_000, rel=0.05 )
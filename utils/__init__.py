@@ -0,0 +1,2 @@
+from utils.cleaning import clean_code
+from utils.loader import DATASET_PATH, load_aggregates, load_dataset
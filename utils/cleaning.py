@@ -0,0 +1,156 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+#====================================================================
+# Cleaning rules / Regras de limpeza
+
+# Valor usado pelo export para campos vazios / Placeholder used by the export for empty fields
+NAN_TOKEN = 'NaN '
+
+# Linhas com 'NaN ' nestas colunas são descartadas / Rows with 'NaN ' in these columns are dropped
+REQUIRED_COLUMNS = ['Delivery_person_Age', 'Road_traffic_density', 'City', 'Festival', 'multiple_deliveries']
+
+# Colunas de texto com espaço no final / Text columns with trailing spaces
+STRIP_COLUMNS = ['ID', 'Delivery_person_ID', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'Festival']
+
+# Chave do pedido: um valor distinto por linha / Order key: one distinct value per row
+KEY_COLUMNS = ['ID']
+
+INT_COLUMNS = ['Delivery_person_Age', 'multiple_deliveries']
+FLOAT_COLUMNS = ['Delivery_person_Ratings']
+
+DATE_FORMAT = '%d-%m-%Y'
+TIME_TAKEN_PREFIX = '(min) '
+
+#====================================================================
+# Functions
+
+def _is_text(series):
+    return series.dtype == object or pd.api.types.is_string_dtype( series.dtype )
+
+def valid_rows(df):
+    """Single-pass validity mask of the rows kept by clean_code
+
+        Input: df: raw Dataframe
+        Output: numpy boolean array, True for the rows to keep
+    """
+    mask = np.ones( len( df ), dtype=bool )
+
+    for col in REQUIRED_COLUMNS:
+        # Colunas numéricas não podem conter 'NaN ' / Numeric columns can not hold 'NaN '
+        if _is_text( df[col] ):
+            mask &= ( df[col].to_numpy() != NAN_TOKEN )
+
+    return mask
+
+def _by_dictionary(series, func):
+    """Apply func to the distinct values of a column and broadcast the result
+
+        Columns like City, Festival or Time_taken(min) hold a few dozen
+        distinct values over thousands of rows, so parsing the dictionary
+        instead of every row is much cheaper.
+
+        Input: series: text Series
+               func: function from an Index of distinct values to an array
+        Output: numpy array aligned with series
+    """
+    codes, uniques = pd.factorize( series, use_na_sentinel=False )
+
+    return np.asarray( func( uniques ) )[codes]
+
+def strip_text(series, dictionary=True):
+    """Trim a text column
+
+        Input: series: text Series
+               dictionary: strip each distinct value only once (use False
+                           for key columns where every value is distinct)
+        Output: Series with the same index and no surrounding spaces
+    """
+    if not _is_text( series ):
+        return series
+
+    if not dictionary:
+        return series.str.strip()
+
+    values = _by_dictionary( series, lambda uniques: np.asarray( uniques.str.strip(), dtype=object ) )
+
+    return pd.Series( values, index=series.index, name=series.name, dtype=object )
+
+def parse_int(series):
+    """Convert a column to int64, skipping the parsing when it is already numeric"""
+    if not _is_text( series ):
+        return series.astype( np.int64 )
+
+    values = _by_dictionary( series, lambda uniques: uniques.to_numpy().astype( np.int64 ) )
+
+    return pd.Series( values, index=series.index, name=series.name )
+
+def parse_float(series):
+    """Convert a column to float64, skipping the parsing when it is already numeric"""
+    if not _is_text( series ):
+        return series.astype( np.float64 )
+
+    values = _by_dictionary( series, lambda uniques: uniques.to_numpy().astype( np.float64 ) )
+
+    return pd.Series( values, index=series.index, name=series.name )
+
+def parse_date(series):
+    """Convert Order_Date ('dd-mm-yyyy') to datetime64"""
+    if pd.api.types.is_datetime64_any_dtype( series.dtype ):
+        return series
+
+    # cache=True converte cada data distinta uma vez / cache=True parses each distinct date once
+    return pd.to_datetime( series, format=DATE_FORMAT, cache=True )
+
+def _extract_minutes(uniques):
+    # Caminho rápido: todos com o mesmo prefixo / Fast path: every value shares the prefix
+    if uniques.str.startswith( TIME_TAKEN_PREFIX ).all():
+        minutes = uniques.str.slice( start=len( TIME_TAKEN_PREFIX ) )
+    else:
+        minutes = uniques.str.extract( r'\(min\) (\S+)', expand=False )
+
+    return minutes.to_numpy().astype( np.int64 )
+
+def parse_time_taken(series):
+    """Extract the integer minutes from values like '(min) 24'
+
+        Input: series: raw Time_taken(min) column
+        Output: int64 Series
+    """
+    if not _is_text( series ):
+        return series.astype( np.int64 )
+
+    values = _by_dictionary( series, _extract_minutes )
+
+    return pd.Series( values, index=series.index, name=series.name )
+
+def clean_code(df):
+    """This function has the responsibility of cleaning the dataframe
+
+        Builds one validity mask, takes a single copy of the kept rows and
+        parses every column with vectorized operations.
+
+        Input: Dataframe
+        Output: Dataframe
+    """
+    # Excluir linhas com 'NaN ' em uma única passada / Drop 'NaN ' rows in a single pass
+    df = df.take( np.flatnonzero( valid_rows( df ) ) )
+
+    # Conversão de tipos / Type conversion
+    for col in INT_COLUMNS:
+        df[col] = parse_int( df[col] )
+
+    for col in FLOAT_COLUMNS:
+        df[col] = parse_float( df[col] )
+
+    df['Order_Date'] = parse_date( df['Order_Date'] )
+
+    # Remover espaço da string / Remove space from strings (trim)
+    for col in STRIP_COLUMNS:
+        df[col] = strip_text( df[col], dictionary=col not in KEY_COLUMNS )
+
+    # Remove o texto dos numeros / Remove text from numbers
+    df['Time_taken(min)'] = parse_time_taken( df['Time_taken(min)'] )
+
+    return df
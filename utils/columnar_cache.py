@@ -0,0 +1,106 @@
+# Libraries
+import hashlib
+import json
+import os
+import tempfile
+import pyarrow as pa
+import pyarrow.feather as feather
+
+#====================================================================
+# Columnar cache of the cleaned dataset / Cache colunar do dataset limpo
+#
+# The cleaned frame is written as an uncompressed Feather (Arrow IPC) file
+# next to the csv, so a fresh process memory-maps it instead of parsing the
+# csv again. The source identity (size, mtime, sha256) is stored in the file
+# metadata and checked on every read.
+
+CACHE_SUFFIX = '.feather'
+
+# Incrementar quando as regras de limpeza mudarem / Bump when the cleaning rules change
+CACHE_VERSION = 3
+
+METADATA_KEY = b'curry_company.source'
+
+#====================================================================
+# Functions
+
+def cache_path_for(csv_path):
+    """Path of the columnar cache that belongs to a csv file"""
+    root, _ = os.path.splitext( csv_path )
+
+    return root + CACHE_SUFFIX
+
+def file_checksum(path, chunk_size=1 << 20):
+    """sha256 of a file, read in 1 MB chunks"""
+    digest = hashlib.sha256()
+
+    with open( path, 'rb' ) as f:
+        for chunk in iter( lambda: f.read( chunk_size ), b'' ):
+            digest.update( chunk )
+
+    return digest.hexdigest()
+
+def source_signature(csv_path):
+    """Description of the csv used to validate the cache
+
+        Input: csv_path: path of the source csv
+        Output: dict with size, mtime_ns, sha256 and cache version
+    """
+    stat = os.stat( csv_path )
+
+    return { 'size': stat.st_size,
+             'mtime_ns': stat.st_mtime_ns,
+             'sha256': file_checksum( csv_path ),
+             'version': CACHE_VERSION }
+
+def read_cache(csv_path, signature):
+    """Memory-map the cached frame if it was built from the same csv
+
+        Input: csv_path: path of the source csv
+               signature: output of source_signature for the current csv
+        Output: Dataframe, or None when the cache is missing or stale
+    """
+    path = cache_path_for( csv_path )
+    if not os.path.exists( path ):
+        return None
+
+    try:
+        table = feather.read_table( path, memory_map=True )
+    except ( OSError, pa.ArrowInvalid ):
+        return None
+
+    stored = ( table.schema.metadata or {} ).get( METADATA_KEY )
+    if stored is None or json.loads( stored ) != signature:
+        return None
+
+    return table.to_pandas( split_blocks=True )
+
+def write_cache(df, csv_path, signature):
+    """Write the cleaned frame next to the csv, replacing the old cache atomically
+
+        Input: df: cleaned Dataframe
+               csv_path: path of the source csv
+               signature: output of source_signature for the csv df came from
+        Output: path of the cache file, or None when it could not be written
+    """
+    path = cache_path_for( csv_path )
+
+    table = pa.Table.from_pandas( df, preserve_index=True )
+    metadata = dict( table.schema.metadata or {} )
+    metadata[METADATA_KEY] = json.dumps( signature ).encode()
+    table = table.replace_schema_metadata( metadata )
+
+    # Escreve em arquivo temporário e renomeia / Write to a temp file and rename
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp( dir=os.path.dirname( path ) or '.', suffix=CACHE_SUFFIX + '.tmp' )
+        os.close( fd )
+        feather.write_feather( table, tmp_path, compression='uncompressed' )
+        os.replace( tmp_path, path )
+    except OSError:
+        # Diretório somente leitura: segue sem cache / Read-only directory: run without the cache
+        if tmp_path is not None and os.path.exists( tmp_path ):
+            os.remove( tmp_path )
+        return None
+
+    return path
@@ -0,0 +1,540 @@
+# Libraries
+import numpy as np
+import pandas as pd
+from utils.filter_index import filter_positions
+from utils.geo import grid_cells
+from utils.instrumentation import traced
+from utils.schema import concat_frames
+from utils.sketch import CELL_LIMIT, distinct_count, hash_values, merge_sketches, registers_of
+
+#====================================================================
+# Pre-aggregated cubes of the orders / Cubos pré-agregados dos pedidos
+#
+# The order cube has one row per (Order_Date, Road_traffic_density,
+# Weatherconditions, City, Festival, Type_of_vehicle) cell, the location cube
+# one row per day and map grid cell of the delivery location and the profile
+# cube one compact row per day, city and deliverer; the delivery table keeps
+# one narrow row per order for the deliverer metrics the profiles cannot
+# answer (filters outside their key, exact percentiles). The delivery time is kept
+# as values, never as a key: moments, extremes and a histogram in fixed
+# buckets, from which the percentiles are read. Every measure is additive
+# (sum, min, max or a distinct-count sketch of the deliverers), so cubes built
+# from separate chunks of the csv merge into the cube of the whole file. The
+# sidebar filters slice the cubes and the charts roll them up, so a rerun
+# costs the number of cells instead of the number of orders.
+
+CUBE_DIMENSIONS = ['Order_Date', 'Road_traffic_density', 'Weatherconditions', 'City', 'Festival', 'Type_of_vehicle']
+
+TIME_COLUMN = 'Time_taken(min)'
+
+# Dia e célula da grade do mapa (utils.geo.grid_cells) / Day and map grid cell (utils.geo.grid_cells)
+# Com os outros filtros na chave o cubo teria quase uma linha por pedido / With the other filters in the key the cube would have almost one row per order
+LOCATION_DIMENSIONS = ['Order_Date', 'cell_lat', 'cell_lon']
+
+# Perfil diário de cada entregador / Daily profile of every deliverer
+# Com mais filtros na chave o cubo teria quase uma linha por pedido / With more filters in the key the cube would have almost one row per order
+PROFILE_DIMENSIONS = ['Order_Date', 'City', 'Delivery_person_ID']
+
+# Um pedido por linha, ordenado pela data: filtros, entregador, nota e tempo (~24 bytes por pedido)
+# One order per row, sorted by date: filters, deliverer, rating and time (~24 bytes per order)
+DELIVERY_COLUMNS = CUBE_DIMENSIONS + ['Delivery_person_ID', 'Delivery_person_Ratings', TIME_COLUMN]
+
+# Histograma do tempo de entrega: faixas de 5 minutos, a última aberta (55 min ou mais)
+# Delivery time histogram: 5-minute buckets, the last one open (55 min or more)
+TIME_BUCKET_MINUTES = 5
+TIME_BUCKETS = 12
+TIME_HISTOGRAM = [f'time_h{bucket:02d}' for bucket in range( TIME_BUCKETS )]
+
+# Medida -> função de redução / Measure -> reduce function
+CUBE_MEASURES = { 'orders': 'sum',
+                  'time_sum': 'sum', 'time_sq_sum': 'sum', 'time_min': 'min', 'time_max': 'max',
+                  'rating_count': 'sum', 'rating_sum': 'sum', 'rating_sq_sum': 'sum',
+                  'distance_sum': 'sum',
+                  'latitude_sum': 'sum', 'longitude_sum': 'sum',
+                  'age_min': 'min', 'age_max': 'max',
+                  'vehicle_min': 'min', 'vehicle_max': 'max' }
+
+# Pedidos por faixa de tempo (order cube e perfis) / Orders per time bucket (order cube and profiles)
+HISTOGRAM_MEASURES = { col: 'sum' for col in TIME_HISTOGRAM }
+
+LOCATION_MEASURES = { 'orders': 'sum' }
+
+PROFILE_MEASURES = { 'orders': 'sum',
+                     'rating_count': 'sum', 'rating_sum': 'sum', 'rating_sq_sum': 'sum',
+                     'time_sum': 'sum', 'time_min': 'min', 'time_max': 'max',
+                     'age_min': 'min', 'age_max': 'max',
+                     'vehicle_min': 'min', 'vehicle_max': 'max' }
+
+# Bit de cada tipo de veículo na máscara vehicle_types / Bit of every vehicle type in the vehicle_types mask
+VEHICLE_TYPES = ['bicycle', 'electric_scooter', 'motorcycle', 'scooter']
+
+# Máscara dos tipos de veículo usados (OU por grupo) / Mask of the vehicle types used (OR per group)
+VEHICLE_MEASURE = 'vehicle_types'
+
+# Sketch dos entregadores distintos por célula (utils.sketch) / Sketch of the distinct deliverers per cell (utils.sketch)
+SET_MEASURE = 'deliverers'
+
+#====================================================================
+# Functions
+
+def _aggregate(df, by, measures):
+    return df.groupby( by, observed=True ).agg( { col: reducer for col, reducer in measures.items() if col in df.columns } )
+
+def _group_sketches(df, by, column, merge):
+    """One distinct-count sketch per group, in the same order as df.groupby(by)
+
+        Sorting once by group and splitting the array avoids a Python call
+        per group through groupby().agg.
+
+        Input: df: Dataframe with the by columns and column
+               column: deliverer hashes (merge=False) or sketches (merge=True)
+        Output: list of sketches (exact sets up to utils.sketch.CELL_LIMIT)
+    """
+    if len( df ) == 0:
+        return []
+
+    codes = df.groupby( by, observed=True ).ngroup().to_numpy()
+
+    if merge:
+        order = np.argsort( codes, kind='stable' )
+        parts = np.split( df[column].to_numpy()[order], np.flatnonzero( np.diff( codes[order] ) ) + 1 )
+        return [part[0] if len( part ) == 1 else merge_sketches( part, CELL_LIMIT ) for part in parts]
+
+    # Ordenados por grupo e hash, sem repetições: cada parte já é um conjunto exato
+    # Sorted by group and hash, without repeats: every part is already an exact set
+    hashes = df[column].to_numpy( dtype=np.uint64 )
+    order = np.lexsort( ( hashes, codes ) )
+    codes, hashes = codes[order], hashes[order]
+    keep = np.ones( len( codes ), dtype=bool )
+    keep[1:] = ( codes[1:] != codes[:-1] ) | ( hashes[1:] != hashes[:-1] )
+    codes, hashes = codes[keep], hashes[keep]
+    parts = np.split( hashes, np.flatnonzero( np.diff( codes ) ) + 1 )
+
+    return [part if len( part ) <= CELL_LIMIT else registers_of( part ) for part in parts]
+
+def _time_histogram(df, by):
+    # Pedidos por grupo e faixa de tempo, na ordem de df.groupby(by) / Orders per group and time bucket, in the order of df.groupby(by)
+    codes = df.groupby( by, observed=True ).ngroup().to_numpy()
+    buckets = np.clip( df[TIME_COLUMN].to_numpy( dtype=np.int64 ) // TIME_BUCKET_MINUTES, 0, TIME_BUCKETS - 1 )
+    groups = codes.max() + 1 if len( codes ) else 0
+
+    counts = np.bincount( codes * TIME_BUCKETS + buckets, minlength=groups * TIME_BUCKETS )
+
+    return counts.reshape( groups, TIME_BUCKETS ).astype( np.int32 )
+
+def _measures(df):
+    time_taken = df[TIME_COLUMN].astype( np.int64 )
+    ratings = df['Delivery_person_Ratings'].astype( np.float64 )
+
+    return { 'orders': 1,
+             'time_sum': time_taken,
+             'time_sq_sum': time_taken * time_taken,
+             'time_min': time_taken,
+             'time_max': time_taken,
+             'rating_count': ratings.notna().astype( np.int64 ),
+             'rating_sum': ratings.fillna( 0 ),
+             'rating_sq_sum': ( ratings * ratings ).fillna( 0 ),
+             'distance_sum': df['distance'],
+             'latitude_sum': df['Delivery_location_latitude'],
+             'longitude_sum': df['Delivery_location_longitude'],
+             'age_min': df['Delivery_person_Age'],
+             'age_max': df['Delivery_person_Age'],
+             'vehicle_min': df['Vehicle_condition'],
+             'vehicle_max': df['Vehicle_condition'] }
+
+def build_cube(df):
+    """Aggregate the cleaned orders into order cube cells
+
+        Input: df: cleaned Dataframe (with the distance column)
+        Output: Dataframe with the cube dimensions, the CUBE_MEASURES columns,
+                the TIME_HISTOGRAM columns and 'deliverers': sketch of the
+                distinct Delivery_person_ID of the cell
+    """
+    cube = _aggregate( df.loc[: , CUBE_DIMENSIONS].assign( **_measures( df ) ), CUBE_DIMENSIONS, CUBE_MEASURES )
+    cube[TIME_HISTOGRAM] = _time_histogram( df, CUBE_DIMENSIONS )
+
+    # Entregadores distintos por célula / Distinct deliverers per cell
+    pairs = df.loc[: , CUBE_DIMENSIONS].assign( deliverer=hash_values( df['Delivery_person_ID'] ) )
+    cube[SET_MEASURE] = _group_sketches( pairs, CUBE_DIMENSIONS, 'deliverer', merge=False )
+
+    return cube.reset_index()
+
+def build_location_cube(df):
+    """Count the cleaned orders per day and map grid cell of the delivery location
+
+        Input: df: cleaned Dataframe
+        Output: Dataframe with the LOCATION_DIMENSIONS and the orders column
+    """
+    df = df.loc[np.isfinite( df['Delivery_location_latitude'] ) & np.isfinite( df['Delivery_location_longitude'] ), ['Order_Date', 'Delivery_location_latitude', 'Delivery_location_longitude']]
+    cell_lat, cell_lon = grid_cells( df['Delivery_location_latitude'], df['Delivery_location_longitude'] )
+
+    return _aggregate( df.loc[: , ['Order_Date']].assign( cell_lat=cell_lat, cell_lon=cell_lon, orders=1 ), LOCATION_DIMENSIONS, LOCATION_MEASURES ).reset_index()
+
+def vehicle_mask(vehicles):
+    """Bit of the VEHICLE_TYPES entry of every vehicle (0 for other types)"""
+    position = pd.Index( VEHICLE_TYPES ).get_indexer( vehicles.astype( str ) )
+
+    return np.where( position >= 0, np.left_shift( 1, np.maximum( position, 0 ) ), 0 ).astype( np.int8 )
+
+def _bit_or(df, by, column):
+    # OU bit a bit por grupo, na ordem de df.groupby(by) / Bitwise OR per group, in the order of df.groupby(by)
+    codes = df.groupby( by, observed=True ).ngroup().to_numpy()
+    mask = np.zeros( codes.max() + 1 if len( codes ) else 0, dtype=np.int8 )
+    np.bitwise_or.at( mask, codes, df[column].to_numpy() )
+
+    return mask
+
+def build_profile_cube(df):
+    """Aggregate the cleaned orders per day, city and deliverer
+
+        Input: df: cleaned Dataframe
+        Output: Dataframe with the PROFILE_DIMENSIONS, the PROFILE_MEASURES
+                columns, the TIME_HISTOGRAM columns and 'vehicle_types': mask
+                of the VEHICLE_TYPES used
+    """
+    measures = { col: value for col, value in _measures( df ).items() if col in PROFILE_MEASURES }
+    df_aux = df.loc[: , PROFILE_DIMENSIONS].assign( **measures, vehicle_types=vehicle_mask( df['Type_of_vehicle'] ) )
+
+    profiles = _aggregate( df_aux, PROFILE_DIMENSIONS, PROFILE_MEASURES )
+    profiles[VEHICLE_MEASURE] = _bit_or( df_aux, PROFILE_DIMENSIONS, VEHICLE_MEASURE )
+    profiles[TIME_HISTOGRAM] = _time_histogram( df, PROFILE_DIMENSIONS )
+
+    return profiles.reset_index()
+
+def build_delivery_table(df):
+    """Narrow per-order table of the deliverer metrics
+
+        Input: df: cleaned Dataframe with the compact schema (utils.schema.apply_schema)
+        Output: Dataframe with the DELIVERY_COLUMNS, sorted by Order_Date
+    """
+    return df.loc[: , DELIVERY_COLUMNS].sort_values( 'Order_Date', kind='stable', ignore_index=True )
+
+def merge_delivery_tables(tables):
+    """Concatenate delivery tables of disjoint sets of orders, in file order
+
+        Input: tables: list of outputs of build_delivery_table
+        Output: delivery table equal to the one built from all the orders together
+    """
+    table = concat_frames( tables ).reset_index( drop=True )
+
+    # Pedidos de dias novos (o caso comum) já chegam em ordem / Orders of new days (the common case) already come in order
+    return table if table['Order_Date'].is_monotonic_increasing else table.sort_values( 'Order_Date', kind='stable', ignore_index=True )
+
+def _measures_of(dimensions):
+    if dimensions == PROFILE_DIMENSIONS:
+        return dict( PROFILE_MEASURES, **HISTOGRAM_MEASURES )
+
+    if dimensions == LOCATION_DIMENSIONS:
+        return LOCATION_MEASURES
+
+    return dict( CUBE_MEASURES, **HISTOGRAM_MEASURES )
+
+def merge_cubes(cubes, dimensions=CUBE_DIMENSIONS):
+    """Merge cubes built from disjoint sets of orders
+
+        Input: cubes: list of order cubes (or location / profile cubes)
+               dimensions: CUBE_DIMENSIONS, LOCATION_DIMENSIONS or PROFILE_DIMENSIONS
+        Output: cube equal to the one built from all the orders together
+    """
+    df = pd.concat( cubes, ignore_index=True )
+
+    cube = _aggregate( df, dimensions, _measures_of( dimensions ) )
+
+    if SET_MEASURE in df.columns:
+        cube[SET_MEASURE] = _group_sketches( df, dimensions, SET_MEASURE, merge=True )
+
+    if VEHICLE_MEASURE in df.columns:
+        cube[VEHICLE_MEASURE] = _bit_or( df, dimensions, VEHICLE_MEASURE )
+
+    if TIME_HISTOGRAM[0] in cube.columns:
+        cube[TIME_HISTOGRAM] = cube[TIME_HISTOGRAM].astype( np.int32 )
+
+    return categorize( cube.reset_index(), dimensions )
+
+def categorize(cube, dimensions):
+    """Sorted categoricals for the text dimensions (concat turns mixed categories into object)"""
+    for col in dimensions:
+        if cube[col].dtype == object:
+            cube[col] = cube[col].astype( 'category' )
+
+    return cube
+
+# Redução elemento a elemento de cada medida / Element-wise reduce of every measure
+_COMBINE = { 'sum': np.add, 'min': np.fmin, 'max': np.fmax }
+
+def update_cube(cube, delta, dimensions=CUBE_DIMENSIONS):
+    """Fold the cube of a few new orders into a large cube, touching only its cells
+
+        The cells of delta found in cube are combined in place of a copy;
+        the others are inserted keeping the sort order, so the cost follows
+        the size of delta instead of the size of cube.
+
+        Input: cube: cube of the orders so far (not modified)
+               delta: cube of new orders with the same dimensions
+               dimensions: CUBE_DIMENSIONS, LOCATION_DIMENSIONS or PROFILE_DIMENSIONS
+        Output: cube with the same cells and measures as merge_cubes( [cube, delta], dimensions )
+    """
+    if len( delta ) == 0:
+        return cube
+
+    cube = cube.copy()
+    delta = delta.copy()
+
+    # Categorias novas vão no fim, sem recodificar o cubo / New categories go last, without recoding the cube
+    for col in dimensions:
+        if isinstance( cube[col].dtype, pd.CategoricalDtype ):
+            values = delta[col].astype( object )
+            missing = pd.Index( values.unique() ).difference( cube[col].cat.categories )
+            if len( missing ):
+                cube[col] = cube[col].cat.add_categories( missing )
+            delta[col] = values.astype( cube[col].dtype )
+
+    positions = pd.MultiIndex.from_frame( cube[dimensions] ).get_indexer( pd.MultiIndex.from_frame( delta[dimensions] ) )
+    found = positions >= 0
+    rows = positions[found]
+
+    for col, reducer in _measures_of( dimensions ).items():
+        if col in cube.columns:
+            values = cube[col].to_numpy().copy()
+            values[rows] = _COMBINE[reducer]( values[rows], delta[col].to_numpy()[found] )
+            cube[col] = values
+
+    if SET_MEASURE in cube.columns:
+        values = cube[SET_MEASURE].to_numpy().copy()
+        values[rows] = [merge_sketches( pair, CELL_LIMIT ) for pair in zip( values[rows], delta[SET_MEASURE].to_numpy()[found] )]
+        cube[SET_MEASURE] = values
+
+    if VEHICLE_MEASURE in cube.columns:
+        values = cube[VEHICLE_MEASURE].to_numpy().copy()
+        values[rows] |= delta[VEHICLE_MEASURE].to_numpy()[found]
+        cube[VEHICLE_MEASURE] = values
+
+    if found.all():
+        return cube
+
+    # Células novas na posição da ordenação do groupby / New cells at their place in the groupby order
+    added = delta.loc[~found, cube.columns]
+    after = len( cube ) == 0 or added['Order_Date'].iloc[0] > cube['Order_Date'].iloc[-1]
+    cube = pd.concat( [cube, added], ignore_index=True )
+
+    # Pedidos de dias novos (o caso comum) só vão para o fim / Orders of new days (the common case) just go last
+    return cube if after else cube.sort_values( dimensions, kind='stable', ignore_index=True )
+
+@traced( 'filter' )
+def slice_cube(cube, date_until=None, traffic=None, weather=None, city=None, festival=None, date_from=None, vehicle=None):
+    """Keep the cells matching the sidebar filters
+
+        Input: cube: order cube, location cube or profile cube (filters on
+                     dimensions the cube does not have are ignored)
+               date_until: keep Order_Date < date_until
+               traffic, weather, city, festival, vehicle: accepted values (None keeps all)
+               date_from: keep Order_Date >= date_from
+        Output: Dataframe with the selected cells (the cube itself when every
+                cell is selected: do not modify it)
+    """
+    # Busca binária na data e bitmaps por valor (utils.filter_index) / Binary search on the date and per-value bitmaps (utils.filter_index)
+    positions = filter_positions( cube, date_until, traffic, weather, city, festival, date_from, vehicle )
+
+    # Todas as células: o próprio cubo, sem cópia (no modo compartilhado, o mapeamento)
+    # Every cell: the cube itself, without a copy (the mapping in shared mode)
+    if len( positions ) == len( cube ):
+        return cube
+
+    return cube.take( positions )
+
+def _sample_std(count, total, sq_total):
+    # Desvio padrão amostral (ddof=1) a partir dos momentos / Sample std (ddof=1) from the moments
+    count = count.astype( np.float64 )
+    variance = ( sq_total - total * total / count ) / ( count - 1 ).where( count > 1 )
+
+    return np.sqrt( variance.clip( lower=0 ) )
+
+@traced( 'aggregate' )
+def rollup(cube, by, distinct=False):
+    """Roll the cells of the order cube up to the requested grouping
+
+        Input: cube: order cube (or a slice of it)
+               by: list of columns to group by
+               distinct: also count distinct deliverers per group (exact up
+                         to utils.sketch.EXACT_LIMIT, estimated above)
+        Output: Dataframe with one row per group and columns
+                orders, time_mean, time_std, time_min, time_max,
+                rating_mean, rating_std, distance_mean, latitude_mean,
+                longitude_mean, age_min, age_max, vehicle_min, vehicle_max
+                (and deliverers when distinct=True)
+    """
+    df_aux = _aggregate( cube, by, CUBE_MEASURES )
+
+    orders = df_aux['orders'].astype( np.float64 )
+    df_aux['time_mean'] = df_aux['time_sum'] / orders
+    df_aux['time_std'] = _sample_std( df_aux['orders'], df_aux['time_sum'], df_aux['time_sq_sum'] )
+
+    rating_count = df_aux['rating_count'].astype( np.float64 ).where( df_aux['rating_count'] > 0 )
+    df_aux['rating_mean'] = df_aux['rating_sum'] / rating_count
+    df_aux['rating_std'] = _sample_std( df_aux['rating_count'], df_aux['rating_sum'], df_aux['rating_sq_sum'] )
+
+    df_aux['distance_mean'] = df_aux['distance_sum'] / orders
+    df_aux['latitude_mean'] = df_aux['latitude_sum'] / orders
+    df_aux['longitude_mean'] = df_aux['longitude_sum'] / orders
+
+    if distinct:
+        df_aux[SET_MEASURE] = cube.groupby( by, observed=True )[SET_MEASURE].agg( distinct_count )
+
+    sums = ['time_sum', 'time_sq_sum', 'rating_count', 'rating_sum', 'rating_sq_sum', 'distance_sum', 'latitude_sum', 'longitude_sum']
+
+    return df_aux.drop( columns=sums ).reset_index()
+
+def distinct_deliverers(cube):
+    """Number of distinct deliverers in a slice of the order cube (sketches merged)"""
+    return distinct_count( cube[SET_MEASURE] )
+
+def _histogram_percentile(histogram, time_min, time_max, q):
+    """Percentile of the delivery time from the bucket counts of each group
+
+        The bucket holding the nearest-rank order is found from the
+        cumulative counts and the value is interpolated inside it, between
+        the bucket bounds narrowed to the group's time_min and time_max (exact
+        when the bucket holds a single time).
+
+        Input: histogram: int array, groups x TIME_BUCKETS
+               time_min, time_max: arrays with the extremes of the groups
+               q: percentile (0 < q <= 1)
+        Output: float array, NaN for groups without orders
+    """
+    histogram = np.asarray( histogram, dtype=np.int64 )
+    cumulative = histogram.cumsum( axis=1 )
+    total = cumulative[: , -1]
+
+    rank = np.maximum( 1, np.ceil( q * total ) )
+    bucket = np.minimum( ( cumulative < rank[: , None] ).sum( axis=1 ), TIME_BUCKETS - 1 )
+
+    rows = np.arange( len( histogram ) )
+    count = histogram[rows, bucket]
+    before = cumulative[rows, bucket] - count
+
+    time_min = np.asarray( time_min, dtype=np.float64 )
+    time_max = np.asarray( time_max, dtype=np.float64 )
+    low = np.maximum( bucket * TIME_BUCKET_MINUTES, time_min )
+    high = np.where( bucket == TIME_BUCKETS - 1, time_max, np.minimum( ( bucket + 1 ) * TIME_BUCKET_MINUTES - 1, time_max ) )
+
+    with np.errstate( invalid='ignore', divide='ignore' ):
+        value = low + ( high - low ) * ( rank - before - 0.5 ) / count
+
+    return np.where( total > 0, value, np.nan )
+
+def _percentile_columns(df_aux, percentiles):
+    # Colunas time_p<100 * q> a partir do histograma do grupo / time_p<100 * q> columns from the histogram of the group
+    histogram = df_aux[TIME_HISTOGRAM].to_numpy()
+
+    for q in percentiles:
+        df_aux[f'time_p{round( 100 * q ):d}'] = _histogram_percentile( histogram, df_aux['time_min'], df_aux['time_max'], q )
+
+    return df_aux.drop( columns=TIME_HISTOGRAM )
+
+@traced( 'aggregate' )
+def time_summary(cube, groupings, percentiles=(0.5, 0.9)):
+    """Delivery time statistics of several groupings from one pass over the cube
+
+        The time moments, extremes and histogram of the order cube are rolled
+        up once to all the grouping columns together, and every grouping is
+        rolled up from that small frame. Percentiles are interpolated inside
+        the TIME_BUCKET_MINUTES bucket that holds them.
+
+        Input: cube: order cube (or a slice of it)
+               groupings: list of lists of columns, e.g. [['Festival'], ['City']]
+               percentiles: percentiles of the delivery time (0 < q <= 1)
+        Output: dict tuple(columns) -> Dataframe with the columns, orders,
+                time_mean, time_std, time_min, time_max and time_p<100 * q>
+    """
+    columns = list( dict.fromkeys( col for by in groupings for col in by ) )
+    measures = dict( { col: CUBE_MEASURES[col] for col in ( 'orders', 'time_sum', 'time_sq_sum', 'time_min', 'time_max' ) }, **HISTOGRAM_MEASURES )
+    base = _aggregate( cube, columns, measures ).reset_index()
+
+    summary = {}
+    for by in groupings:
+        by = list( by )
+        df_aux = _aggregate( base, by, measures )
+
+        df_aux['time_mean'] = df_aux['time_sum'] / df_aux['orders'].astype( np.float64 )
+        df_aux['time_std'] = _sample_std( df_aux['orders'], df_aux['time_sum'], df_aux['time_sq_sum'] )
+
+        summary[tuple( by )] = _percentile_columns( df_aux, percentiles ).drop( columns=['time_sum', 'time_sq_sum'] ).reset_index()
+
+    return summary
+
+@traced( 'aggregate' )
+def rollup_profiles(profile_cube, by=None, percentile=None):
+    """Roll the daily deliverer profiles up, one row per deliverer by default
+
+        Input: profile_cube: profile cube (or a slice of it)
+               by: columns to group by (default: ['Delivery_person_ID'])
+               percentile: also compute this percentile of the delivery time
+                           (0 < percentile <= 1, see time_summary)
+        Output: Dataframe with the by columns, orders, rating_mean, rating_std,
+                time_mean, time_min, time_max, age_min, age_max, vehicle_min,
+                vehicle_max and vehicle_types (mask of VEHICLE_TYPES)
+                (and time_p<100 * percentile>)
+    """
+    by = by or ['Delivery_person_ID']
+
+    df_aux = _aggregate( profile_cube, by, dict( PROFILE_MEASURES, **HISTOGRAM_MEASURES ) )
+    df_aux[VEHICLE_MEASURE] = _bit_or( profile_cube, by, VEHICLE_MEASURE )
+
+    rating_count = df_aux['rating_count'].astype( np.float64 ).where( df_aux['rating_count'] > 0 )
+    df_aux['rating_mean'] = df_aux['rating_sum'] / rating_count
+    df_aux['rating_std'] = _sample_std( df_aux['rating_count'], df_aux['rating_sum'], df_aux['rating_sq_sum'] )
+    df_aux['time_mean'] = df_aux['time_sum'] / df_aux['orders'].astype( np.float64 )
+    df_aux = _percentile_columns( df_aux, [] if percentile is None else [percentile] )
+
+    return df_aux.drop( columns=['rating_count', 'rating_sum', 'rating_sq_sum', 'time_sum'] ).reset_index()
+
+def _nearest_rank(codes, times, q):
+    # Percentil exato por grupo a partir da contagem de cada minuto / Exact percentile per group from the count of every minute
+    if len( times ) == 0:
+        return np.array( [], dtype=np.float64 )
+
+    low = times.min()
+    width = times.max() - low + 1
+    groups = codes.max() + 1
+
+    counts = np.bincount( codes * width + ( times - low ), minlength=groups * width ).reshape( groups, width )
+    cumulative = counts.cumsum( axis=1 )
+    rank = np.maximum( 1, np.ceil( q * cumulative[: , -1] ) )
+
+    return ( low + ( cumulative < rank[: , None] ).sum( axis=1 ) ).astype( np.float64 )
+
+@traced( 'aggregate' )
+def rollup_deliveries(delivery_table, by=None, percentile=None):
+    """Roll a slice of the delivery table up, one row per deliverer by default
+
+        Input: delivery_table: delivery table (or a slice of it)
+               by: columns to group by (default: ['Delivery_person_ID'])
+               percentile: also compute this percentile of the delivery time
+                           (0 < percentile <= 1, exact nearest rank)
+        Output: Dataframe with the by columns, orders, rating_mean, rating_std,
+                time_mean, time_min and time_max (and time_p<100 * percentile>)
+    """
+    by = by or ['Delivery_person_ID']
+    groups = delivery_table.groupby( by, observed=True )
+
+    df_aux = groups.agg( orders=( TIME_COLUMN, 'size' ),
+                         rating_mean=( 'Delivery_person_Ratings', 'mean' ),
+                         rating_std=( 'Delivery_person_Ratings', 'std' ),
+                         time_mean=( TIME_COLUMN, 'mean' ),
+                         time_min=( TIME_COLUMN, 'min' ),
+                         time_max=( TIME_COLUMN, 'max' ) )
+
+    if percentile is not None:
+        times = delivery_table[TIME_COLUMN].to_numpy( dtype=np.int64 )
+        df_aux[f'time_p{round( 100 * percentile ):d}'] = _nearest_rank( groups.ngroup().to_numpy(), times, percentile )
+
+    return df_aux.reset_index()
+
+@traced( 'aggregate' )
+def rollup_locations(location_cube):
+    """Orders per map grid cell in a slice of the location cube
+
+        Input: location_cube: location cube (or a slice of it)
+        Output: Dataframe with cell_lat, cell_lon and orders
+    """
+    return _aggregate( location_cube, ['cell_lat', 'cell_lon'], LOCATION_MEASURES ).reset_index()
@@ -0,0 +1,157 @@
+# Libraries
+from collections import OrderedDict
+import threading
+import time
+import numpy as np
+from utils.instrumentation import register_counters
+
+#====================================================================
+# Figure cache / Cache das figuras
+#
+# Figures are kept per (chart, filter state) for the data version they were
+# built from, so reruns that only switch tabs, and other sessions with the same
+# filters, reuse them instead of rebuilding. The data version is the identity
+# of the full aggregates object: a reload builds a new object and every entry
+# of the old one is dropped. Entries also leave by LRU order (count and bytes
+# of the trace data) and after a time to live.
+
+FIGURE_CACHE_ENTRIES = 256
+
+FIGURE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Segundos até uma figura ser refeita / Seconds until a figure is rebuilt
+FIGURE_CACHE_TTL = 600
+
+_MISSING = object()
+
+#====================================================================
+# Classes
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entries, bytes and age
+
+        Every entry remembers the source object it was built from and is
+        only served for that same object.
+    """
+    def __init__(self, max_entries, max_bytes=None, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # chave -> (origem, expira em, bytes, valor) / key -> (source, expires at, bytes, value)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop( key )[2]
+
+    def get(self, key, source, default=None):
+        """Cached value of key built from source, or default"""
+        with self._lock:
+            entry = self._entries.get( key, _MISSING )
+
+            if entry is not _MISSING and entry[0] is not source:
+                self._drop( key )
+                entry = _MISSING
+            elif entry is not _MISSING and entry[1] is not None and entry[1] < time.monotonic():
+                self._drop( key )
+                self.expirations += 1
+                entry = _MISSING
+
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end( key )
+            self.hits += 1
+
+            return entry[3]
+
+    def put(self, key, source, value, size=0):
+        """Store value for key; entries of other sources are dropped"""
+        with self._lock:
+            for old_key in [old_key for old_key, entry in self._entries.items() if entry[0] is not source or old_key == key]:
+                self._drop( old_key )
+
+            expires = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = ( source, expires, size, value )
+            self._bytes += size
+
+            while len( self._entries ) > 1 and ( len( self._entries ) > self.max_entries or
+                                                 ( self.max_bytes is not None and self._bytes > self.max_bytes ) ):
+                self._drop( next( iter( self._entries ) ) )
+                self.evictions += 1
+
+    def get_or_build(self, key, source, build, sizer=None):
+        """Cached value, or build() stored under key
+
+            Input: key: hashable key
+                   source: object the value is built from (data version)
+                   build: function () -> value
+                   sizer: function value -> bytes (default: 0)
+            Output: value
+        """
+        value = self.get( key, source, _MISSING )
+
+        if value is _MISSING:
+            value = build()
+            self.put( key, source, value, sizer( value ) if sizer is not None else 0 )
+
+        return value
+
+    def stats(self):
+        """Counters of the cache: entries, bytes, hits, misses, evictions and expirations"""
+        with self._lock:
+            return { 'entries': len( self._entries ), 'bytes': self._bytes,
+                     'hits': self.hits, 'misses': self.misses,
+                     'evictions': self.evictions, 'expirations': self.expirations }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+#====================================================================
+# Functions
+
+_figures = LRUCache( FIGURE_CACHE_ENTRIES, FIGURE_CACHE_BYTES, FIGURE_CACHE_TTL )
+register_counters( 'figure_cache', _figures.stats )
+
+def _payload_size(value):
+    # Bytes aproximados dos valores de uma série / Approximate bytes of the values of a trace
+    if isinstance( value, np.ndarray ) and value.dtype != object:
+        return value.nbytes
+
+    if isinstance( value, dict ):
+        return sum( _payload_size( item ) for item in value.values() )
+
+    if isinstance( value, ( list, tuple, np.ndarray ) ):
+        return sum( _payload_size( item ) for item in value )
+
+    return len( value ) if isinstance( value, str ) else 8
+
+def _figure_size(fig):
+    # Os dados das séries dominam; sem serializar a figura / Trace data dominates; without serializing the figure
+    return sum( _payload_size( trace.to_plotly_json() ) for trace in fig.data )
+
+def cached_figure(chart, source, filters, build):
+    """Figure of a chart for a filter state, built once per data version
+
+        Input: chart: name of the chart function
+               source: full aggregates the figure is built from
+               filters: FilterSpec of the sidebar (utils.filters)
+               build: function () -> plotly figure
+        Output: plotly figure (shared: do not modify it)
+    """
+    return _figures.get_or_build( ( chart, filters ), source, build, _figure_size )
+
+def figure_cache_stats():
+    """Counters of the figure cache"""
+    return _figures.stats()
+
+def clear_figure_cache():
+    """Drop every cached figure"""
+    _figures.clear()
@@ -0,0 +1,125 @@
+# Libraries
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+#====================================================================
+# Filter index of the cubes / Índice de filtros dos cubos
+#
+# Cubes come out of the groupby sorted by Order_Date (their first dimension),
+# so the date cut is a binary search. For every value of the categorical
+# filters a packed bitmap of the rows is kept; a selection ORs the bitmaps of
+# the selected values, ANDs the columns over the rows before the date cut and
+# returns row positions. The index is built once per cube object.
+
+FILTER_COLUMNS = ['Road_traffic_density', 'Weatherconditions', 'City', 'Festival', 'Type_of_vehicle']
+
+# id(cube) -> CubeIndex, removido quando o cubo é coletado / removed when the cube is collected
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+#====================================================================
+# Classes
+
+class CubeIndex:
+    """Sorted dates and packed per-value row bitmaps of one cube"""
+
+    def __init__(self, cube):
+        dates = cube['Order_Date'].to_numpy()
+
+        # Cubos já vêm ordenados; outros frames são ordenados aqui / Cubes are already sorted; other frames are sorted here
+        self.order = None if pd.Index( dates ).is_monotonic_increasing else np.argsort( dates, kind='stable' )
+        self.dates = dates if self.order is None else dates[self.order]
+        self.rows = len( dates )
+
+        self.bitmaps = {}
+        for col in FILTER_COLUMNS:
+            if col not in cube.columns:
+                continue
+
+            values = cube[col] if self.order is None else cube[col].take( self.order )
+            codes, uniques = pd.factorize( values )
+            self.bitmaps[col] = { value: np.packbits( codes == code ) for code, value in enumerate( uniques ) }
+
+    def _selected(self, col, values, first, size):
+        # OU dos bitmaps dos valores escolhidos / OR of the bitmaps of the selected values
+        bitmaps = self.bitmaps[col]
+        selected = np.zeros( size - first, dtype=np.uint8 )
+
+        for value in set( values ):
+            bitmap = bitmaps.get( value )
+            if bitmap is not None:
+                selected |= bitmap[first:size]
+
+        return selected
+
+    def _date_position(self, day):
+        return int( np.searchsorted( self.dates, np.datetime64( pd.Timestamp( day ), 'ns' ), side='left' ) )
+
+    def positions(self, date_until=None, date_from=None, **filters):
+        """Row positions of the cube that match the filters
+
+            Input: date_until: keep Order_Date < date_until
+                   date_from: keep Order_Date >= date_from
+                   filters: column=accepted values for the FILTER_COLUMNS (None keeps all)
+            Output: sorted numpy array of row positions
+        """
+        start = 0 if date_from is None else self._date_position( date_from )
+        end = self.rows if date_until is None else self._date_position( date_until )
+        if end <= start:
+            return np.array( [], dtype=np.int64 )
+
+        # Os bitmaps só são lidos entre os bytes das duas datas / The bitmaps are only read between the bytes of the two dates
+        first = start // 8
+        size = ( end + 7 ) // 8
+
+        mask = None
+        for col, values in filters.items():
+            if values is None or col not in self.bitmaps:
+                continue
+
+            selected = self._selected( col, values, first, size )
+            mask = selected if mask is None else mask & selected
+
+        if mask is None:
+            positions = np.arange( start, end )
+        else:
+            positions = np.flatnonzero( np.unpackbits( mask, count=end - 8 * first ) ) + 8 * first
+            positions = positions[positions >= start]
+
+        if self.order is not None:
+            positions = np.sort( self.order[positions] )
+
+        return positions
+
+#====================================================================
+# Functions
+
+def index_for(cube):
+    """CubeIndex of a cube, built on the first call for that object"""
+    key = id( cube )
+
+    with _indexes_lock:
+        index = _indexes.get( key )
+        if index is not None:
+            return index
+
+    index = CubeIndex( cube )
+
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = index
+            weakref.finalize( cube, _indexes.pop, key, None )
+
+    return _indexes[key]
+
+def filter_positions(cube, date_until=None, traffic=None, weather=None, city=None, festival=None, date_from=None, vehicle=None):
+    """Row positions of the cube cells selected by the sidebar filters (no copy of the cube)"""
+    return index_for( cube ).positions( date_until,
+                                        date_from,
+                                        Road_traffic_density=traffic,
+                                        Weatherconditions=weather,
+                                        City=city,
+                                        Festival=festival,
+                                        Type_of_vehicle=vehicle )
@@ -0,0 +1,75 @@
+# Libraries
+from collections import namedtuple
+import pandas as pd
+from utils.cube import slice_cube
+
+#====================================================================
+# Filter spec shared by the pages / Especificação dos filtros compartilhada pelas páginas
+#
+# The sidebar selection is normalized into one immutable FilterSpec: dates
+# become day Timestamps and value lists become sorted tuples, so equal
+# selections compare (and hash) equal and the spec can key caches directly.
+
+# date_from, date_to: dias incluídos / included days
+# traffic, weather, city, festival, vehicle: tuplas de valores aceitos (None mantém tudo) / tuples of accepted values (None keeps all)
+FilterSpec = namedtuple( 'FilterSpec', ['date_from', 'date_to', 'traffic', 'weather', 'city', 'festival', 'vehicle'],
+                         defaults=[None] * 7 )
+
+# Campo do filtro -> dimensão do cubo / Filter field -> cube dimension
+FILTER_DIMENSIONS = { 'traffic': 'Road_traffic_density',
+                      'weather': 'Weatherconditions',
+                      'city': 'City',
+                      'festival': 'Festival',
+                      'vehicle': 'Type_of_vehicle' }
+
+# Ordem de exibição do tráfego / Display order of the traffic levels
+TRAFFIC_ORDER = ['Low', 'Medium', 'High', 'Jam']
+
+#====================================================================
+# Functions
+
+def _day(value):
+    return None if value is None else pd.Timestamp( value ).normalize()
+
+def make_filters(date_from=None, date_to=None, **values):
+    """Normalized FilterSpec
+
+        Input: date_from, date_to: first and last day included (None: no bound)
+               values: traffic, weather, city, festival, vehicle lists (None keeps all)
+        Output: FilterSpec
+    """
+    values = { field: None if selected is None else tuple( sorted( str( value ) for value in selected ) )
+               for field, selected in values.items() }
+
+    return FilterSpec( _day( date_from ), _day( date_to ), **values )
+
+def filter_options(cube):
+    """Date bounds and values present in the data, for the sidebar widgets
+
+        Input: cube: full order cube
+        Output: dict with 'dates': (first day, last day) and a sorted list of
+                values per FilterSpec field
+    """
+    dates = cube['Order_Date']
+    options = { 'dates': ( dates.min(), dates.max() ) }
+
+    for field, col in FILTER_DIMENSIONS.items():
+        values = sorted( str( value ) for value in cube[col].dropna().unique() )
+        if field == 'traffic':
+            values.sort( key=lambda value: TRAFFIC_ORDER.index( value ) if value in TRAFFIC_ORDER else len( TRAFFIC_ORDER ) )
+        options[field] = values
+
+    return options
+
+def apply_filters(cube, filters):
+    """Cells of a cube (order, location or profile cube) selected by a FilterSpec"""
+    date_until = None if filters.date_to is None else filters.date_to + pd.Timedelta( days=1 )
+
+    return slice_cube( cube,
+                       date_from=filters.date_from,
+                       date_until=date_until,
+                       traffic=filters.traffic,
+                       weather=filters.weather,
+                       city=filters.city,
+                       festival=filters.festival,
+                       vehicle=filters.vehicle )
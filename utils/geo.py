@@ -0,0 +1,73 @@
+# Libraries
+import numpy as np
+
+#====================================================================
+# Great-circle distance / Distância entre restaurante e entrega
+
+# Mesmo raio médio usado pelo pacote haversine / Same mean radius used by the haversine package
+EARTH_RADIUS_KM = 6371.0088
+
+# Lado das células do mapa em graus (~28 km) / Side of the map cells in degrees (~28 km)
+GRID_DEGREES = 0.25
+
+#====================================================================
+# Functions
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized haversine distance in km
+
+        Input: lat1, lon1, lat2, lon2: arrays (or scalars) in degrees
+        Output: numpy array with the distance of each pair of points
+    """
+    lat1, lon1, lat2, lon2 = ( np.radians( np.asarray( x, dtype=np.float64 ) ) for x in ( lat1, lon1, lat2, lon2 ) )
+
+    d = np.sin( ( lat2 - lat1 ) * 0.5 ) ** 2 + np.cos( lat1 ) * np.cos( lat2 ) * np.sin( ( lon2 - lon1 ) * 0.5 ) ** 2
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin( np.sqrt( d ) )
+
+def add_distance(df):
+    """Add the 'distance' column (restaurant -> delivery location, in km) for every order
+
+        Input: df: cleaned Dataframe
+        Output: the same Dataframe with the new column
+    """
+    df['distance'] = haversine_km( df['Restaurant_latitude'].to_numpy(),
+                                   df['Restaurant_longitude'].to_numpy(),
+                                   df['Delivery_location_latitude'].to_numpy(),
+                                   df['Delivery_location_longitude'].to_numpy() )
+
+    return df
+
+def grid_cells(lat, lon, size=GRID_DEGREES):
+    """Grid cell of each point, vectorized
+
+        Input: lat, lon: arrays in degrees
+               size: side of the cells in degrees
+        Output: (row, col) int32 arrays: floor(coordinate / size)
+    """
+    lat = np.asarray( lat, dtype=np.float64 )
+    lon = np.asarray( lon, dtype=np.float64 )
+
+    return np.floor( lat / size ).astype( np.int32 ), np.floor( lon / size ).astype( np.int32 )
+
+def grid_geojson(cells, size=GRID_DEGREES, properties=('orders',)):
+    """GeoJSON FeatureCollection with one square polygon per grid cell
+
+        Input: cells: Dataframe with cell_lat, cell_lon and the property columns
+               size: side of the cells in degrees
+               properties: columns copied to the properties of each feature
+        Output: dict
+    """
+    south = cells['cell_lat'].to_numpy( dtype=np.float64 ) * size
+    west = cells['cell_lon'].to_numpy( dtype=np.float64 ) * size
+    values = [cells[col].tolist() for col in properties]
+
+    features = []
+    for i, ( s, w ) in enumerate( zip( south.tolist(), west.tolist() ) ):
+        n, e = s + size, w + size
+        features.append( { 'type': 'Feature',
+                           'geometry': { 'type': 'Polygon', 'coordinates': [[[w, s], [e, s], [e, n], [w, n], [w, s]]] },
+                           'properties': { col: column[i] for col, column in zip( properties, values ) } } )
+
+    return { 'type': 'FeatureCollection', 'features': features }
+
@@ -0,0 +1,113 @@
+# Libraries
+from collections import namedtuple
+import hashlib
+import io
+import os
+import pandas as pd
+
+#====================================================================
+# Incremental append / Leitura apenas dos pedidos novos
+#
+# New orders are appended to the end of the csv every day. A high-water mark
+# remembers how far the file was read; when the file grows and the bytes
+# before the mark are unchanged, only the new lines are parsed.
+
+# Bytes usados para conferir que o conteúdo antigo não mudou / Bytes checked to make sure the old content did not change
+DIGEST_BYTES = 64 * 1024
+
+# offset: bytes consumidos (sempre no fim de uma linha) / bytes consumed (always at the end of a line)
+# rows: linhas de dados antes do offset / data rows before the offset
+HighWaterMark = namedtuple( 'HighWaterMark', ['offset', 'rows', 'columns', 'head_digest', 'tail_digest'] )
+
+#====================================================================
+# Functions
+
+def _digest(f, start, end):
+    f.seek( start )
+
+    return hashlib.sha256( f.read( end - start ) ).hexdigest()
+
+def _last_line_end(f, size):
+    # Ignora uma última linha ainda sendo escrita / Skip a last line that is still being written
+    position = size
+    while position > 0:
+        start = max( 0, position - DIGEST_BYTES )
+        f.seek( start )
+        block = f.read( position - start )
+        newline = block.rfind( b'\n' )
+        if newline != -1:
+            return start + newline + 1
+        position = start
+
+    return 0
+
+def mark_file(path):
+    """High-water mark at the last complete line of the file
+
+        Input: path: path of the csv file
+        Output: HighWaterMark
+    """
+    with open( path, 'rb' ) as f:
+        offset = _last_line_end( f, os.fstat( f.fileno() ).st_size )
+
+        f.seek( 0 )
+        header = f.readline()
+        columns = pd.read_csv( io.BytesIO( header ), nrows=0 ).columns.tolist()
+
+        # Conta as linhas em blocos de 1 MB / Count the lines in 1 MB blocks
+        f.seek( 0 )
+        lines, remaining = 0, offset
+        while remaining > 0:
+            block = f.read( min( remaining, 1 << 20 ) )
+            lines += block.count( b'\n' )
+            remaining -= len( block )
+
+        return HighWaterMark( offset=offset,
+                              rows=max( lines - 1, 0 ),
+                              columns=columns,
+                              head_digest=_digest( f, 0, min( offset, DIGEST_BYTES ) ),
+                              tail_digest=_digest( f, max( 0, offset - DIGEST_BYTES ), offset ) )
+
+def read_appended(path, mark):
+    """Raw rows appended to the file after the high-water mark
+
+        Input: path: path of the csv file
+               mark: HighWaterMark of the last read
+        Output: (raw Dataframe of the new rows, new HighWaterMark), or None
+                when the file was not only appended (truncated, rewritten...)
+                and has to be read again from the start
+    """
+    with open( path, 'rb' ) as f:
+        size = os.fstat( f.fileno() ).st_size
+
+        if size < mark.offset:
+            return None
+
+        if _digest( f, 0, min( mark.offset, DIGEST_BYTES ) ) != mark.head_digest:
+            return None
+
+        if _digest( f, max( 0, mark.offset - DIGEST_BYTES ), mark.offset ) != mark.tail_digest:
+            return None
+
+        offset = _last_line_end( f, size )
+        if offset < mark.offset:
+            offset = mark.offset
+
+        f.seek( mark.offset )
+        data = f.read( offset - mark.offset )
+
+        if data:
+            df = pd.read_csv( io.BytesIO( data ), header=None, names=mark.columns, encoding="utf-8" )
+        else:
+            df = pd.DataFrame( columns=mark.columns )
+
+        # Índice continua a numeração das linhas do csv / Index continues the csv row numbering
+        df.index = pd.RangeIndex( mark.rows, mark.rows + len( df ) )
+
+        new_mark = HighWaterMark( offset=offset,
+                                  rows=mark.rows + len( df ),
+                                  columns=mark.columns,
+                                  head_digest=_digest( f, 0, min( offset, DIGEST_BYTES ) ),
+                                  tail_digest=_digest( f, max( 0, offset - DIGEST_BYTES ), offset ) )
+
+    return df, new_mark
@@ -0,0 +1,273 @@
+# Libraries
+from collections import namedtuple
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import threading
+import time
+
+#====================================================================
+# Per-render instrumentation / Instrumentação de cada renderização
+#
+# Stages (read, clean, aggregate, filter, chart...) are wrapped in spans that
+# record their duration and the number of rows they received. The spans of a
+# page rerun are logged as one JSON line, shown in the debug sidebar panel and
+# summed into Prometheus-style counters. When tracing is off every span is a
+# shared no-op object and traced functions are called directly.
+
+# Variável de ambiente que liga a instrumentação / Environment variable that turns the instrumentation on
+TRACE_ENV = "CURRY_TRACE"
+
+# Porta do endpoint /metrics (sem ela não há servidor) / Port of the /metrics endpoint (no server without it)
+METRICS_PORT_ENV = "CURRY_METRICS_PORT"
+
+Span = namedtuple( 'Span', ['stage', 'name', 'seconds', 'rows'] )
+
+logger = logging.getLogger( 'curry_company.instrumentation' )
+
+_enabled = os.environ.get( TRACE_ENV, '' ).lower() in ( '1', 'true', 'yes' )
+
+# Renderização em andamento de cada thread do streamlit / Render in progress of each streamlit thread
+_local = threading.local()
+
+# (stage, name) -> [count, seconds, rows]; page -> [renders, seconds]
+_totals = {}
+_renders = {}
+_totals_lock = threading.Lock()
+
+# nome -> função que devolve um dict de contadores (caches...) / name -> function returning a dict of counters (caches...)
+_counters = {}
+
+_server = None
+_server_lock = threading.Lock()
+
+#====================================================================
+# Spans
+
+class _NullSpan:
+    """Span used while tracing is off: does nothing"""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    """Times the block and records it on exit; set .rows inside the block when known"""
+    __slots__ = ( 'stage', 'name', 'rows', 'start' )
+
+    def __init__(self, stage, name, rows):
+        self.stage, self.name, self.rows = stage, name, rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _record( Span( self.stage, self.name, time.perf_counter() - self.start, self.rows ) )
+        return False
+
+def _record(span):
+    render = getattr( _local, 'render', None )
+    if render is not None:
+        render[2].append( span )
+
+    with _totals_lock:
+        totals = _totals.setdefault( ( span.stage, span.name ), [0, 0.0, 0] )
+        totals[0] += 1
+        totals[1] += span.seconds
+        totals[2] += span.rows or 0
+
+def _rows(obj):
+    # Linhas de um Dataframe/Series/array, None para o resto (escalares numpy têm shape, mas não len)
+    # Rows of a Dataframe/Series/array, None otherwise (numpy scalars have a shape but no len)
+    return len( obj ) if getattr( obj, 'ndim', 0 ) >= 1 else None
+
+#====================================================================
+# Functions
+
+def enabled():
+    """True when spans are being recorded"""
+    return _enabled
+
+def set_enabled(flag):
+    """Turn the instrumentation on or off for the whole process"""
+    global _enabled
+    _enabled = bool( flag )
+
+def span(stage, name=None, rows=None):
+    """Context manager that times a block of code
+
+        Input: stage: stage of the pipeline ('read', 'clean', 'filter', ...)
+               name: name of the step (default: the stage)
+               rows: number of rows the step works on
+        Output: span object; assign .rows inside the block when it is only known there
+    """
+    if not _enabled:
+        return _NULL_SPAN
+
+    return _Span( stage, name or stage, rows )
+
+def traced(stage):
+    """Decorator that records a span per call, named after the function
+
+        The rows of the span are the length of the first argument (or of the
+        result) when it is a Dataframe.
+    """
+    def decorator(func):
+        @functools.wraps( func )
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func( *args, **kwargs )
+
+            with _Span( stage, func.__name__, _rows( args[0] ) if args else None ) as current:
+                result = func( *args, **kwargs )
+                if current.rows is None:
+                    current.rows = _rows( result )
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+def register_counters(name, func):
+    """Export the counters returned by func() as curry_<name>_<counter>
+
+        Input: name: prefix of the metrics ('figure_cache', ...)
+               func: function () -> dict counter -> number
+    """
+    _counters[name] = func
+
+def begin_render(page):
+    """Start collecting the spans of one page rerun (in the current thread)"""
+    if not _enabled:
+        return
+
+    _local.render = ( page, time.perf_counter(), [] )
+    start_metrics_server()
+
+def end_render():
+    """Finish the page rerun started by begin_render and log its spans
+
+        Output: list of Span of the rerun, ending with a 'render' span for the
+                whole rerun (empty when tracing is off)
+    """
+    render = getattr( _local, 'render', None )
+    if render is None:
+        return []
+
+    _local.render = None
+    page, start, spans = render
+    seconds = time.perf_counter() - start
+
+    with _totals_lock:
+        totals = _renders.setdefault( page, [0, 0.0] )
+        totals[0] += 1
+        totals[1] += seconds
+
+    logger.info( json.dumps( { 'page': page,
+                               'seconds': round( seconds, 6 ),
+                               'spans': [dict( span._asdict(), seconds=round( span.seconds, 6 ) ) for span in spans] } ) )
+
+    return spans + [Span( 'render', page, seconds, None )]
+
+def prometheus_text():
+    """Counters of every span and page render in the Prometheus text format"""
+    with _totals_lock:
+        totals = sorted( _totals.items() )
+        renders = sorted( _renders.items() )
+
+    lines = ['# HELP curry_span_seconds Time spent in each instrumented step',
+             '# TYPE curry_span_seconds summary']
+    for ( stage, name ), ( count, seconds, _ ) in totals:
+        labels = f'stage="{stage}",name="{name}"'
+        lines.append( f'curry_span_seconds_count{{{labels}}} {count}' )
+        lines.append( f'curry_span_seconds_sum{{{labels}}} {seconds:.6f}' )
+
+    lines += ['# HELP curry_span_rows_total Rows received by each instrumented step',
+              '# TYPE curry_span_rows_total counter']
+    for ( stage, name ), ( _, _, rows ) in totals:
+        lines.append( f'curry_span_rows_total{{stage="{stage}",name="{name}"}} {rows}' )
+
+    lines += ['# HELP curry_render_seconds Time spent rendering each page',
+              '# TYPE curry_render_seconds summary']
+    for page, ( count, seconds ) in renders:
+        lines.append( f'curry_render_seconds_count{{page="{page}"}} {count}' )
+        lines.append( f'curry_render_seconds_sum{{page="{page}"}} {seconds:.6f}' )
+
+    for name, func in sorted( _counters.items() ):
+        for counter, value in func().items():
+            lines.append( f'curry_{name}_{counter} {value}' )
+
+    return '\n'.join( lines ) + '\n'
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split( '?' )[0] != '/metrics':
+            self.send_error( 404 )
+            return
+
+        body = prometheus_text().encode()
+        self.send_response( 200 )
+        self.send_header( 'Content-Type', 'text/plain; version=0.0.4' )
+        self.send_header( 'Content-Length', str( len( body ) ) )
+        self.end_headers()
+        self.wfile.write( body )
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port=None):
+    """Serve prometheus_text at http://0.0.0.0:port/metrics (once per process)
+
+        Input: port: port to listen on (default: CURRY_METRICS_PORT; no server when unset)
+        Output: the HTTP server, or None
+    """
+    global _server
+
+    port = port or os.environ.get( METRICS_PORT_ENV )
+    if not port:
+        return None
+
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer( ( '0.0.0.0', int( port ) ), _MetricsHandler )
+            except OSError:
+                # Porta ocupada por outro processo do servidor / Port taken by another server process
+                logger.warning( 'metrics endpoint not started: port %s unavailable', port )
+                _server = False
+                return None
+            threading.Thread( target=_server.serve_forever, name='curry-metrics', daemon=True ).start()
+
+    return _server or None
+
+def debug_panel(spans):
+    """Sidebar panel with the spans of the last rerun (only while tracing is on)
+
+        Input: spans: output of end_render
+    """
+    if not _enabled:
+        return
+
+    import pandas as pd
+    import streamlit as st
+
+    df_aux = pd.DataFrame( spans, columns=Span._fields )
+    df_aux['ms'] = ( 1000 * df_aux['seconds'] ).round( 2 )
+
+    with st.sidebar.expander( 'Debug - timings' ):
+        st.dataframe( df_aux.loc[: , ['stage', 'name', 'ms', 'rows']], hide_index=True )
+
+        for name, func in sorted( _counters.items() ):
+            st.caption( name + ': ' + ', '.join( f'{counter} {value}' for counter, value in func().items() ) )
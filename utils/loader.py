@@ -0,0 +1,263 @@
+# Libraries
+import logging
+import os
+import threading
+import pandas as pd
+from utils.cleaning import clean_code
+from utils.geo import add_distance
+from utils.schema import apply_schema, concat_frames
+from utils.columnar_cache import read_cache, source_signature, write_cache
+from utils.incremental import mark_file, read_appended
+from utils.instrumentation import span, traced
+from utils.parallel import configured_workers, parallel_aggregates
+from utils.shared_dataset import configured_root, shared_aggregates
+from utils.streaming import aggregates_from_frame, prepare_chunk, stream_aggregates, update_aggregates
+
+#====================================================================
+# Shared dataset loader / Carregamento compartilhado do dataset
+
+DATASET_PATH = "dataset/train.csv"
+
+# Variável de ambiente que liga a leitura em blocos / Environment variable that turns on chunked ingestion
+STREAMING_ENV = "CURRY_STREAMING"
+
+# Cache do processo: (tipo, caminho) -> (identidade do arquivo, objeto, marca de leitura)
+# Process-wide cache: (kind, path) -> (file identity, object, high-water mark)
+_cache = {}
+_cache_lock = threading.RLock()
+
+# Um construtor por objeto; leitores de outros objetos não esperam / One builder per object; readers of other objects do not wait
+_build_locks = {}
+
+# Arquivos servidos com a última versão enquanto o refresher reconstrói (utils.refresh)
+# Files served with the last version while the refresher rebuilds (utils.refresh)
+_stale_paths = set()
+
+logger = logging.getLogger( 'curry_company.loader' )
+
+#====================================================================
+# Functions
+
+def file_identity(path):
+    """Identity of the source file used as cache key
+
+        Input: path: path of the csv file
+        Output: tuple (absolute path, size in bytes, mtime in ns)
+    """
+    stat = os.stat( path )
+
+    return ( os.path.abspath( path ), stat.st_size, stat.st_mtime_ns )
+
+def read_dataset(path=DATASET_PATH, disk_cache=True, mark=None):
+    """Read and clean the dataset without touching the in-process cache
+
+        When disk_cache is on, the cleaned frame is memory-mapped from the
+        columnar cache next to the csv, and the cache is rebuilt whenever
+        the csv size, mtime or checksum changes.
+
+        Input: path: path of the csv file
+               disk_cache: use the columnar cache on disk
+               mark: HighWaterMark; only the rows before it are read
+        Output: cleaned Dataframe with the compact dtypes of utils.schema
+                and the distance column of utils.geo
+    """
+    if disk_cache:
+        signature = source_signature( path )
+        # O cache só vale se cobre exatamente as linhas marcadas / The cache only fits if it covers exactly the marked rows
+        disk_cache = mark is None or signature['size'] == mark.offset
+
+    if disk_cache:
+        with span( 'read', 'read_cache' ) as current:
+            df = read_cache( path, signature )
+            current.rows = None if df is None else len( df )
+        if df is not None:
+            return df
+
+    with span( 'read', 'read_csv' ) as current:
+        df = pd.read_csv( path, encoding="utf-8", nrows=mark.rows if mark is not None else None )
+        current.rows = len( df )
+    df = clean_rows( df )
+
+    if disk_cache:
+        write_cache( df, path, signature )
+
+    return df
+
+@traced( 'clean' )
+def clean_rows(df):
+    """Cleaning rules, compact schema and distance column applied to raw rows"""
+    return add_distance( apply_schema( clean_code( df ) ) )
+
+def _build_lock(entry):
+    with _cache_lock:
+        return _build_locks.setdefault( entry, threading.Lock() )
+
+def _cached(kind, path, build, append, revalidate=False):
+    """Return the object built from the file, reading only what changed since the last call
+
+        When the file only grew, append receives the new raw rows (it may
+        return None to rebuild instead); any other change rebuilds the object
+        from the start. While a background
+        refresher watches the file (serve_stale), the last version is returned
+        at once and only the refresher rebuilds it.
+
+        Input: kind: name of the cached object ('dataset', 'aggregates', ...)
+               path: path of the csv file
+               build: function (path, HighWaterMark) -> object
+               append: function (object, raw Dataframe of new rows) -> object
+               revalidate: check the file even when the last version is served stale
+        Output: cached object
+    """
+    entry = ( kind, os.path.abspath( path ) )
+
+    # Sem os.stat: o arquivo pode estar sendo substituído / Without os.stat: the file may be being replaced
+    with _cache_lock:
+        cached = _cache.get( entry )
+        if cached is not None and entry[1] in _stale_paths and not revalidate:
+            return cached[1]
+
+    key = file_identity( path )
+
+    with _cache_lock:
+        cached = _cache.get( entry )
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    with _build_lock( entry ):
+        # Outro leitor pode ter construído enquanto esperávamos / Another reader may have built it while we waited
+        with _cache_lock:
+            cached = _cache.get( entry )
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        obj = None
+        if cached is not None:
+            appended = read_appended( path, cached[2] )
+            if appended is not None:
+                new_rows, mark = appended
+                obj = append( cached[1], new_rows ) if len( new_rows ) else cached[1]
+
+        if obj is None:
+            mark = mark_file( path )
+            obj = build( path, mark )
+
+        # Troca atômica: quem lê vê a versão anterior ou a nova / Atomic swap: readers see the previous or the new version
+        with _cache_lock:
+            _cache[entry] = ( key, obj, mark )
+
+    return obj
+
+@traced( 'load' )
+def load_dataset(path=DATASET_PATH):
+    """Return the cleaned dataset, parsing the csv only once per process
+
+        The cache is keyed on (path, size, mtime), so a changed file is
+        never served stale: appended orders are parsed and added to the
+        cached frame, any other change reloads the file.
+        The returned Dataframe is shared between reruns and sessions:
+        filter it (df.loc creates a copy) before adding columns.
+
+        Input: path: path of the csv file
+        Output: cleaned Dataframe with the compact dtypes of utils.schema
+    """
+    return _cached( 'dataset', path, *LOADERS['dataset'] )
+
+def build_aggregates(path=DATASET_PATH, streaming=None, mark=None, workers=None, shared=None):
+    """Build the cubes the pages render from
+
+        When shared is on, the cubes come from the shared store of
+        utils.shared_dataset: one process of the host builds and publishes
+        them, every process maps the same read-only copy.
+
+        Input: path: path of the csv file
+               streaming: read the csv in chunks so the full frame is never
+                          in memory (default: CURRY_STREAMING environment variable)
+               mark: HighWaterMark; only the rows before it are read
+               workers: clean and aggregate partitions of the csv in this many
+                        processes (default: CURRY_WORKERS environment variable)
+               shared: use the shared store (default: CURRY_SHARED_DATASET environment variable)
+        Output: utils.streaming.Aggregates
+    """
+    if shared is None:
+        shared = configured_root() is not None
+
+    # A loja guarda versões do arquivo inteiro / The store keeps versions of the whole file
+    if shared and ( mark is None or os.path.getsize( path ) == mark.offset ):
+        try:
+            with span( 'read', 'shared_aggregates' ):
+                return shared_aggregates( path, lambda: build_aggregates( path, streaming, mark, workers, shared=False ) )
+        except ( OSError, ValueError ) as error:
+            # Cubos que não cabem na loja (texto com nulos, disco cheio...): cópia deste processo
+            # Cubes the store cannot hold (text with nulls, full disk...): a copy of this process
+            logger.warning( 'shared aggregates unavailable for %s, building them in this process: %s', path, error )
+
+    if streaming is None:
+        streaming = os.environ.get( STREAMING_ENV, '' ).lower() in ( '1', 'true', 'yes' )
+
+    workers = workers or configured_workers()
+
+    if workers > 1:
+        return parallel_aggregates( path, workers, end=mark.offset if mark is not None else None )
+
+    if streaming:
+        return stream_aggregates( path, nrows=mark.rows if mark is not None else None )
+
+    # O dataframe completo só existe durante a construção / The full frame only lives while the cubes are built
+    return aggregates_from_frame( read_dataset( path, mark=mark ) )
+
+@traced( 'load' )
+def load_aggregates(path=DATASET_PATH):
+    """Return the cubes of the dataset, built once per file version
+
+        Orders appended to the csv are folded into the cached cubes.
+
+        Input: path: path of the csv file
+        Output: utils.streaming.Aggregates
+    """
+    return _cached( 'aggregates', path, *LOADERS['aggregates'] )
+
+def _append_aggregates(aggregates, new_rows):
+    # No modo compartilhado a nova versão é publicada, em vez de uma cópia por processo
+    # In shared mode the new version is published instead of one copy per process
+    if configured_root() is not None:
+        return None
+
+    return update_aggregates( aggregates, prepare_chunk( new_rows, aggregates.deliverer_ids ) )
+
+# Objeto em cache -> (construção, append) / Cached object -> (build, append)
+LOADERS = { 'dataset': ( lambda path, mark: read_dataset( path, mark=mark ),
+                         lambda df, new_rows: concat_frames( [df, clean_rows( new_rows )] ) ),
+            'aggregates': ( lambda path, mark: build_aggregates( path, mark=mark ), _append_aggregates ) }
+
+def serve_stale(path=DATASET_PATH, enabled=True):
+    """Serve the cached objects of the file without checking it on each call
+
+        Used while a background refresher (utils.refresh) keeps them up to date.
+
+        Input: path: path of the csv file
+               enabled: False checks the file on every call again
+    """
+    with _cache_lock:
+        if enabled:
+            _stale_paths.add( os.path.abspath( path ) )
+        else:
+            _stale_paths.discard( os.path.abspath( path ) )
+
+def refresh(path=DATASET_PATH, kinds=None):
+    """Bring the cached objects of the file up to date with its current content
+
+        Input: path: path of the csv file
+               kinds: names of the objects (default: the ones already cached,
+                      or 'aggregates' when none is)
+        Output: dict kind -> up-to-date object
+    """
+    if kinds is None:
+        with _cache_lock:
+            kinds = [kind for kind, cached_path in _cache if cached_path == os.path.abspath( path )] or ['aggregates']
+
+    return { kind: _cached( kind, path, *LOADERS[kind], revalidate=True ) for kind in kinds }
+
+def clear_cache():
+    """Drop every object kept by the process cache"""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,71 @@
+# Libraries
+import branca.colormap as cm
+import folium
+from utils.figure_cache import FIGURE_CACHE_TTL, LRUCache
+from utils.geo import GRID_DEGREES, grid_geojson
+from utils.instrumentation import register_counters
+
+#====================================================================
+# Binned delivery map / Mapa das entregas agregadas em células
+#
+# Delivery locations are counted per grid cell on the server (utils.cube
+# location cube), so the browser receives one GeoJSON layer with a polygon per
+# occupied cell instead of one marker per point. The rendered HTML is kept per
+# filter combination.
+
+# Mapas guardados (combinações de filtros) / Maps kept (filter combinations)
+MAP_CACHE_SIZE = 32
+
+MAP_COLORS = ['#ffffb2', '#fd8d3c', '#bd0026']
+
+_html_cache = LRUCache( MAP_CACHE_SIZE, ttl=FIGURE_CACHE_TTL )
+register_counters( 'map_cache', _html_cache.stats )
+
+#====================================================================
+# Functions
+
+def grid_map(cells, size=GRID_DEGREES):
+    """Folium map with the orders per grid cell as one GeoJSON layer
+
+        Input: cells: Dataframe with cell_lat, cell_lon and orders (utils.cube.rollup_locations)
+               size: side of the cells in degrees
+        Output: folium.Map
+    """
+    map = folium.Map()
+    if len( cells ) == 0:
+        return map
+
+    colormap = cm.LinearColormap( MAP_COLORS, vmin=float( cells['orders'].min() ), vmax=float( max( cells['orders'].max(), cells['orders'].min() + 1 ) ) )
+    colormap.caption = 'Orders per cell'
+
+    cells = cells.assign( color=[colormap( value ) for value in cells['orders'].tolist()] )
+    geojson = grid_geojson( cells, size, properties=( 'orders', 'color' ) )
+
+    folium.GeoJson( geojson,
+                    style_function=lambda feature: { 'fillColor': feature['properties']['color'],
+                                                     'color': feature['properties']['color'],
+                                                     'weight': 0.5,
+                                                     'fillOpacity': 0.7 },
+                    tooltip=folium.GeoJsonTooltip( fields=['orders'], aliases=['Orders'] ) ).add_to( map )
+    colormap.add_to( map )
+
+    # Enquadra as células ocupadas / Fit the view to the occupied cells
+    map.fit_bounds( [[float( cells['cell_lat'].min() * size ), float( cells['cell_lon'].min() * size )],
+                     [float( ( cells['cell_lat'].max() + 1 ) * size ), float( ( cells['cell_lon'].max() + 1 ) * size )]] )
+
+    return map
+
+def map_html(map):
+    """Standalone HTML of a folium map, as folium_static renders it"""
+    return folium.Figure().add_child( map ).render()
+
+def cached_map_html(key, source, build):
+    """HTML of a map built once per filter combination and data version
+
+        Input: key: hashable description of the filters
+               source: full aggregates the map is built from; another object
+                       means the data changed and the cached maps are dropped
+               build: function () -> folium.Map
+        Output: HTML string
+    """
+    return _html_cache.get_or_build( key, source, lambda: map_html( build() ), len )
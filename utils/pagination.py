@@ -0,0 +1,107 @@
+# Libraries
+from collections import namedtuple
+import math
+import threading
+import numpy as np
+from utils.figure_cache import FIGURE_CACHE_TTL, LRUCache
+from utils.instrumentation import register_counters
+
+#====================================================================
+# Server-side paginated tables / Tabelas paginadas no servidor
+#
+# A table is kept with an index: one stable sort order per (column,
+# direction), built on first use, and the lowercase search keys. A page is
+# the search mask applied to the sort order and sliced, so only page_size
+# rows are taken from the frame and sent to the browser, whatever the size
+# of the table. Indexes are cached per (table, filters) for the data version.
+
+PAGE_SIZE = 20
+
+TABLE_CACHE_ENTRIES = 64
+
+# rows: linhas da página / rows of the page
+# page, pages: página atual (a partir de 1) e número de páginas / current page (from 1) and number of pages
+# total: linhas que passam na busca / rows matching the search
+TablePage = namedtuple( 'TablePage', ['rows', 'page', 'pages', 'total'] )
+
+#====================================================================
+# Classes
+
+class TableIndex:
+    """Sort orders and search keys of one table, built on first use"""
+
+    def __init__(self, frame, search_column=None):
+        self.frame = frame.reset_index( drop=True )
+        self.search_column = search_column
+
+        self._orders = {}
+        self._keys = None
+        self._lock = threading.Lock()
+
+    def order(self, column=None, descending=False):
+        """Row positions sorted by column (stable, missing values last)"""
+        with self._lock:
+            order = self._orders.get( ( column, descending ) )
+
+        if order is None:
+            if column is None:
+                order = np.arange( len( self.frame ) )
+            else:
+                order = self.frame[column].sort_values( ascending=not descending, kind='stable', na_position='last' ).index.to_numpy()
+
+            with self._lock:
+                self._orders[( column, descending )] = order
+
+        return order
+
+    def matches(self, search):
+        """Mask of the rows whose search column contains the text (None: no search)"""
+        if not search or self.search_column is None:
+            return None
+
+        if self._keys is None:
+            self._keys = self.frame[self.search_column].astype( str ).str.lower()
+
+        return self._keys.str.contains( search.strip().lower(), regex=False ).to_numpy()
+
+    def page(self, page=1, page_size=PAGE_SIZE, sort_by=None, descending=False, search=None):
+        """One page of the table
+
+            Input: page: page number, from 1 (clamped to the pages there are)
+                   page_size: rows per page
+                   sort_by: column to sort by (None keeps the table order)
+                   descending: sort from the largest value
+                   search: text the search column must contain
+            Output: TablePage
+        """
+        order = self.order( sort_by, descending )
+
+        mask = self.matches( search )
+        if mask is not None:
+            order = order[mask[order]]
+
+        total = len( order )
+        pages = max( 1, math.ceil( total / page_size ) )
+        page = min( max( 1, int( page ) ), pages )
+
+        rows = self.frame.take( order[( page - 1 ) * page_size : page * page_size] )
+
+        return TablePage( rows, page, pages, total )
+
+#====================================================================
+# Functions
+
+_tables = LRUCache( TABLE_CACHE_ENTRIES, ttl=FIGURE_CACHE_TTL )
+register_counters( 'table_cache', _tables.stats )
+
+def cached_table(name, source, filters, build, search_column=None):
+    """TableIndex of a table for a filter state, built once per data version
+
+        Input: name: name of the table (plus anything else it depends on)
+               source: full aggregates the table is built from
+               filters: FilterSpec
+               build: function () -> Dataframe
+               search_column: column searched by the text box (None: no search)
+        Output: TableIndex (shared: do not modify its frame)
+    """
+    return _tables.get_or_build( ( name, filters ), source, lambda: TableIndex( build(), search_column ) )
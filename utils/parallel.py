@@ -0,0 +1,158 @@
+# Libraries
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import pickle
+import subprocess
+import sys
+import pandas as pd
+from utils.cube import LOCATION_DIMENSIONS, PROFILE_DIMENSIONS, merge_cubes, merge_delivery_tables
+from utils.streaming import Aggregates, fold_chunk, prepare_chunk
+
+#====================================================================
+# Parallel cleaning and aggregation / Limpeza e agregação em paralelo
+#
+# The csv is split into byte ranges that end on line boundaries. Each range
+# is cleaned and aggregated by a worker process, and the partial cubes are
+# merged: sums, mins and maxes add up, mean and std come from the merged
+# moments and the deliverer sketches are merged (they hash the ids, so the
+# local dictionaries of the workers do not matter).
+# Workers are fresh interpreters running this module (python -m
+# utils.parallel), fed by a thread pool: multiprocessing would import the
+# __main__ of the server in every worker, and under streamlit that is the
+# page being rendered.
+
+# Variável de ambiente com o número de processos / Environment variable with the number of processes
+WORKERS_ENV = "CURRY_WORKERS"
+
+# Tamanho máximo de cada partição / Maximum size of each partition
+PARTITION_BYTES = 64 * 1024 * 1024
+
+# Diretório de onde os processos importam o pacote / Directory the worker processes import the package from
+PROJECT_ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+#====================================================================
+# Functions
+
+def configured_workers():
+    """Number of worker processes from CURRY_WORKERS (1 when unset)"""
+    value = os.environ.get( WORKERS_ENV, '' ).strip().lower()
+
+    if value in ( 'auto', 'all' ):
+        return os.cpu_count() or 1
+
+    return max( 1, int( value ) ) if value else 1
+
+def byte_ranges(path, parts, end=None):
+    """Split the data lines of the csv into contiguous byte ranges
+
+        Input: path: path of the csv file
+               parts: wanted number of ranges
+               end: stop at this byte offset (default: end of the file)
+        Output: (header line, list of (start, stop) offsets)
+    """
+    with open( path, 'rb' ) as f:
+        header = f.readline()
+        start = f.tell()
+        end = os.fstat( f.fileno() ).st_size if end is None else end
+
+        ranges = []
+        step = max( 1, ( end - start ) // max( 1, parts ) )
+        while start < end:
+            # Avança até o fim da linha / Move forward to the end of the line
+            f.seek( min( start + step, end ) )
+            f.readline()
+            stop = min( f.tell(), end )
+            ranges.append( ( start, stop ) )
+            start = stop
+
+    return header, ranges
+
+def aggregate_range(path, header, start, stop):
+    """Worker: clean and aggregate one byte range of the csv
+
+        Input: path: path of the csv file
+               header: header line of the csv
+               start, stop: byte offsets of the range
+        Output: Aggregates with deliverer codes local to the range
+    """
+    with open( path, 'rb' ) as f:
+        f.seek( start )
+        data = f.read( stop - start )
+
+    deliverer_ids = []
+    df = pd.read_csv( io.BytesIO( header + data ), encoding="utf-8" )
+
+    return fold_chunk( None, prepare_chunk( df, deliverer_ids ) )._replace( deliverer_ids=deliverer_ids )
+
+def run_worker(path, ranges):
+    """Aggregate byte ranges of the csv in a new python process
+
+        Input: path: path of the csv file
+               ranges: list of (start, stop) byte offsets
+        Output: Aggregates of the ranges, merged by the worker
+    """
+    command = [sys.executable, '-m', 'utils.parallel', os.path.abspath( path )] + [f'{start}-{stop}' for start, stop in ranges]
+    result = subprocess.run( command, cwd=PROJECT_ROOT, capture_output=True )
+
+    if result.returncode != 0:
+        raise RuntimeError( f'worker for {path} failed:\n{result.stderr.decode( errors="replace" )}' )
+
+    return pickle.loads( result.stdout )
+
+def merge_partials(partials):
+    """Merge the Aggregates of disjoint partitions
+
+        Input: partials: list of Aggregates, each with its own deliverer dictionary
+        Output: Aggregates with one sorted deliverer dictionary
+    """
+    global_ids = sorted( set().union( *( partial.deliverer_ids for partial in partials ) ) )
+
+    cube = merge_cubes( [partial.cube for partial in partials] )
+    locations = merge_cubes( [partial.locations for partial in partials], LOCATION_DIMENSIONS )
+    profiles = merge_cubes( [partial.profiles for partial in partials], PROFILE_DIMENSIONS )
+    deliveries = merge_delivery_tables( [partial.deliveries for partial in partials] )
+
+    return Aggregates( cube, global_ids, locations, profiles, deliveries )
+
+def parallel_aggregates(path, workers=None, end=None):
+    """Build the aggregates of the csv with a pool of worker processes
+
+        Input: path: path of the csv file
+               workers: number of processes (default: CURRY_WORKERS)
+               end: only read the csv up to this byte offset
+        Output: Aggregates
+    """
+    workers = workers or configured_workers()
+    size = ( os.path.getsize( path ) if end is None else end )
+    parts = max( workers, -( -size // PARTITION_BYTES ) )
+
+    header, ranges = byte_ranges( path, parts, end )
+
+    if workers == 1:
+        partials = [aggregate_range( path, header, start, stop ) for start, stop in ranges]
+    else:
+        # Um processo por worker, com uma fatia contígua das partições; cada thread espera um processo
+        # One process per worker, with a contiguous share of the partitions; every thread waits on one process
+        shares = [ranges[index * len( ranges ) // workers : ( index + 1 ) * len( ranges ) // workers] for index in range( workers )]
+        with ThreadPoolExecutor( max_workers=workers ) as pool:
+            partials = list( pool.map( lambda share: run_worker( path, share ), [share for share in shares if share] ) )
+
+    return merge_partials( partials )
+
+def main(argv):
+    """Worker process: python -m utils.parallel path start-stop [start-stop ...]
+
+        Writes the pickled Aggregates of the ranges, merged, to stdout.
+    """
+    path = argv[1]
+    with open( path, 'rb' ) as f:
+        header = f.readline()
+
+    ranges = [tuple( int( offset ) for offset in bounds.split( '-' ) ) for bounds in argv[2:]]
+    partials = [aggregate_range( path, header, start, stop ) for start, stop in ranges]
+
+    pickle.dump( merge_partials( partials ), sys.stdout.buffer, protocol=pickle.HIGHEST_PROTOCOL )
+
+if __name__ == '__main__':
+    main( sys.argv )
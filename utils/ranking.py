@@ -0,0 +1,57 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+#====================================================================
+# Top-k selection per group / Seleção dos k melhores por grupo
+#
+# The statistics are computed once per deliverer; for every group the k
+# smallest and the k largest values are found with np.argpartition (linear
+# time) and only the selected rows are sorted.
+
+#====================================================================
+# Functions
+
+def _select(values, keys, rows, k, largest):
+    # rows: posições do grupo / positions of the group
+    group_values = -values[rows] if largest else values[rows]
+
+    if len( rows ) > k:
+        chosen = np.argpartition( group_values, k - 1 )[:k]
+        # Empates com o k-ésimo entram e o desempate é pela chave / Ties with the k-th come in and the key breaks them
+        candidates = np.flatnonzero( group_values <= group_values[chosen].max() )
+    else:
+        candidates = np.arange( len( rows ) )
+
+    order = np.lexsort( ( keys[rows[candidates]], group_values[candidates] ) )[:k]
+
+    return rows[candidates[order]]
+
+def top_k(df, k, metric, by='City', key='Delivery_person_ID'):
+    """k smallest and k largest values of metric in every group
+
+        Input: df: Dataframe with one row per key (and group)
+               k: number of rows per group
+               metric: column to rank by; rows where it is NaN are left out
+               by: group column (every value in the data gets its own top-k)
+               key: column used to break ties
+        Output: (smallest, largest) Dataframes with the by, key and metric
+                columns, groups in sorted order, smallest ascending and largest
+                descending within each group
+    """
+    df = df.loc[df[metric].notna(), [by, key, metric]].reset_index( drop=True )
+
+    values = df[metric].to_numpy( dtype=np.float64 )
+    keys = pd.factorize( df[key], sort=True )[0]
+    groups, _ = pd.factorize( df[by], sort=True )
+
+    smallest, largest = [], []
+    for group in range( groups.max() + 1 if len( groups ) else 0 ):
+        rows = np.flatnonzero( groups == group )
+        smallest.append( _select( values, keys, rows, k, largest=False ) )
+        largest.append( _select( values, keys, rows, k, largest=True ) )
+
+    def take(parts):
+        return df.take( np.concatenate( parts ) if parts else np.array( [], dtype=np.int64 ) ).reset_index( drop=True )
+
+    return take( smallest ), take( largest )
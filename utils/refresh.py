@@ -0,0 +1,164 @@
+# Libraries
+from collections import namedtuple
+from datetime import datetime
+import logging
+import os
+import threading
+import time
+from utils.instrumentation import register_counters
+from utils.loader import DATASET_PATH, file_identity, refresh, serve_stale
+
+#====================================================================
+# Background refresh / Atualização em segundo plano
+#
+# One daemon thread per server process watches the csv. When its size or
+# modification time changes, the cached objects are rebuilt (or extended
+# with the appended rows) off the request path, and swapped in when they are
+# ready. Meanwhile the loader serves the last good version (stale while
+# revalidate), so no rerun waits for a rebuild; a failed refresh keeps the
+# previous version and is retried on the next change.
+
+# Variável de ambiente com o intervalo entre verificações, em segundos (0 desliga)
+# Environment variable with the interval between checks, in seconds (0 turns it off)
+REFRESH_ENV = "CURRY_REFRESH_SECONDS"
+
+DEFAULT_INTERVAL = 30
+
+logger = logging.getLogger( 'curry_company.refresh' )
+
+# last_refresh: fim da última atualização / end of the last refresh (datetime)
+# duration: segundos da última atualização / seconds of the last refresh
+# rows: pedidos na versão servida / orders in the served version
+# error: erro da última tentativa (None quando deu certo) / error of the last attempt (None when it worked)
+RefreshStatus = namedtuple( 'RefreshStatus', ['path', 'interval', 'last_refresh', 'duration', 'rows', 'refreshes', 'failures', 'error'] )
+
+_refreshers = {}
+_refreshers_lock = threading.Lock()
+
+#====================================================================
+# Classes
+
+class Refresher:
+    """Daemon thread that keeps the cached objects of one csv up to date"""
+
+    def __init__(self, path=DATASET_PATH, interval=DEFAULT_INTERVAL):
+        self.path = os.path.abspath( path )
+        self.interval = interval
+
+        self._identity = None
+        self._status = RefreshStatus( self.path, interval, None, None, None, 0, 0, None )
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread( target=self._run, name='curry-refresher', daemon=True )
+
+    def start(self):
+        # A partir daqui os leitores recebem a última versão sem esperar / From here on readers get the last version without waiting
+        serve_stale( self.path )
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        self._stop.set()
+        serve_stale( self.path, enabled=False )
+
+    def check(self):
+        """Refresh the cached objects if the file changed since the last check
+
+            Output: True when a refresh ran
+        """
+        identity = file_identity( self.path )
+        if identity == self._identity:
+            return False
+
+        # Um arquivo com erro só é tentado de novo quando muda / A broken file is only tried again when it changes
+        self._identity = identity
+
+        started = time.perf_counter()
+        try:
+            objects = refresh( self.path )
+        except Exception as error:
+            # Mantém a versão anterior / Keep the previous version
+            logger.exception( 'refresh of %s failed', self.path )
+            with self._lock:
+                self._status = self._status._replace( failures=self._status.failures + 1, error=repr( error ) )
+            return True
+
+        with self._lock:
+            self._status = self._status._replace( last_refresh=datetime.now(),
+                                                  duration=time.perf_counter() - started,
+                                                  rows=_rows( objects ),
+                                                  refreshes=self._status.refreshes + 1,
+                                                  error=None )
+
+        return True
+
+    def status(self):
+        """RefreshStatus of the last check"""
+        with self._lock:
+            return self._status
+
+    def counters(self):
+        """Counters of the metrics endpoint and the debug panel"""
+        status = self.status()
+
+        return { 'refreshes': status.refreshes,
+                 'failures': status.failures,
+                 'duration_seconds': status.duration or 0.0,
+                 'rows': status.rows or 0,
+                 'age_seconds': ( datetime.now() - status.last_refresh ).total_seconds() if status.last_refresh else 0.0 }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except OSError:
+                # Arquivo sendo substituído; a próxima verificação o encontra / File being replaced; the next check finds it
+                logger.warning( 'dataset %s unavailable', self.path )
+
+            self._stop.wait( self.interval )
+
+#====================================================================
+# Functions
+
+def _rows(objects):
+    # Pedidos da versão servida / Orders of the served version
+    if 'aggregates' in objects:
+        return int( objects['aggregates'].cube['orders'].sum() )
+
+    return len( next( iter( objects.values() ) ) )
+
+def configured_interval():
+    """Seconds between checks from CURRY_REFRESH_SECONDS (DEFAULT_INTERVAL when unset)"""
+    value = os.environ.get( REFRESH_ENV, '' ).strip()
+
+    return float( value ) if value else DEFAULT_INTERVAL
+
+def start_refresher(path=DATASET_PATH, interval=None):
+    """Start the background refresher of the csv (once per process)
+
+        Input: path: path of the csv file
+               interval: seconds between checks (default: CURRY_REFRESH_SECONDS)
+        Output: Refresher, or None when the interval is 0
+    """
+    interval = configured_interval() if interval is None else interval
+    if interval <= 0:
+        return None
+
+    with _refreshers_lock:
+        refresher = _refreshers.get( os.path.abspath( path ) )
+        if refresher is None:
+            refresher = Refresher( path, interval ).start()
+            _refreshers[refresher.path] = refresher
+
+            if refresher.path == os.path.abspath( DATASET_PATH ):
+                register_counters( 'refresh', refresher.counters )
+
+    return refresher
+
+def refresh_status(path=DATASET_PATH):
+    """RefreshStatus of the refresher of the csv (None when there is none)"""
+    with _refreshers_lock:
+        refresher = _refreshers.get( os.path.abspath( path ) )
+
+    return refresher.status() if refresher is not None else None
@@ -0,0 +1,81 @@
+# Libraries
+import pandas as pd
+
+#====================================================================
+# Compact dtype schema of the cleaned frame / Schema de tipos compactos do dataframe limpo
+
+# Colunas de baixa cardinalidade viram category / Low-cardinality columns become categoricals
+CATEGORY_COLUMNS = ['Delivery_person_ID', 'Weatherconditions', 'Road_traffic_density', 'Type_of_order',
+                    'Type_of_vehicle', 'Festival', 'City', 'Time_Orderd', 'Time_Order_picked']
+
+# Inteiros reduzidos para o menor tipo que comporta os valores / Integers downcast to the smallest safe width
+INT_COLUMNS = ['Delivery_person_Age', 'Vehicle_condition', 'multiple_deliveries', 'Time_taken(min)']
+
+# Latitude/longitude e notas continuam float64: float32 perderia precisão
+# Latitude/longitude and ratings stay float64: float32 would lose precision
+
+#====================================================================
+# Functions
+
+def apply_schema(df):
+    """Convert the cleaned frame to compact dtypes
+
+        Categories are sorted, so groupbys keep the same row order they had
+        on the object columns. Group with observed=True to skip the empty
+        category combinations.
+
+        Input: df: cleaned Dataframe
+        Output: Dataframe with categorical and downcast integer columns
+    """
+    df = df.copy( deep=False )
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance( df[col].dtype, pd.CategoricalDtype ):
+            df[col] = df[col].astype( 'category' )
+
+    for col in INT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric( df[col], downcast='integer' )
+
+    return df
+
+def concat_frames(frames):
+    """Concatenate compact frames, keeping the categorical columns categorical
+
+        Input: frames: list of outputs of apply_schema
+        Output: Dataframe with the union of the categories (sorted)
+    """
+    frames = [df.copy( deep=False ) for df in frames]
+
+    for col in CATEGORY_COLUMNS:
+        if all( col in df.columns and isinstance( df[col].dtype, pd.CategoricalDtype ) for df in frames ):
+            categories = sorted( set().union( *( df[col].cat.categories for df in frames ) ) )
+            for df in frames:
+                df[col] = df[col].cat.set_categories( categories )
+
+    return pd.concat( frames )
+
+def memory_report(before, after):
+    """Memory used by each column before and after apply_schema
+
+        Input: before: cleaned Dataframe
+               after: output of apply_schema(before)
+        Output: Dataframe with before/after/saved bytes per column and a Total row
+    """
+    report = pd.DataFrame( { 'before_bytes': before.memory_usage( index=False, deep=True ),
+                             'after_bytes': after.memory_usage( index=False, deep=True ) } )
+    report.loc['Total'] = report.sum()
+    report['saved_bytes'] = report['before_bytes'] - report['after_bytes']
+    report['saved_perc'] = ( 100 * report['saved_bytes'] / report['before_bytes'] ).round( 1 )
+
+    return report
+
+#====================================================================
+
+if __name__ == '__main__':
+    # Relatório de memória do dataset atual / Memory report of the current dataset
+    from utils.loader import DATASET_PATH
+    from utils.cleaning import clean_code
+
+    df = clean_code( pd.read_csv( DATASET_PATH, encoding="utf-8" ) )
+    print( memory_report( df, apply_schema( df ) ).to_string() )
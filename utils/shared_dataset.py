@@ -0,0 +1,315 @@
+# Libraries
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from utils.columnar_cache import CACHE_VERSION
+from utils.instrumentation import register_counters
+from utils.sketch import is_exact
+from utils.streaming import Aggregates
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sem trava; no pior caso dois processos publicam a mesma versão
+    # Windows: no lock; at worst two processes publish the same version
+    fcntl = None
+
+#====================================================================
+# Shared-memory aggregates / Agregados em memória compartilhada
+#
+# Several server processes on one host attach to a single copy of the
+# aggregates the pages render from (utils.streaming.Aggregates). The first
+# process that needs a version of the csv builds them and publishes every
+# table as raw numpy files under a shared directory (/dev/shm when there is
+# one, so the pages live in RAM): numeric and date columns as they are,
+# categoricals as codes plus their categories, text as utf-8 bytes plus
+# offsets, distinct-count sketches as their bytes plus offsets. Every
+# process, the publisher included, then memory-maps the files read-only and
+# wraps them in Dataframes without copying, so the aggregates are in RAM once
+# whatever the number of processes; a process only keeps its own filter
+# indexes and slices. The cleaned frame is not published: it only lives in
+# the publisher while the aggregates are built.
+# A file lock lets a single process build each version; the directory of a
+# version is renamed into place only once it is complete. A table the store
+# cannot hold, such as a text column with missing values, raises ValueError
+# and the loader builds the aggregates in the process instead.
+
+# Variável de ambiente que liga o modo compartilhado: 1 ou um diretório
+# Environment variable that turns the shared mode on: 1 or a directory
+SHARED_ENV = "CURRY_SHARED_DATASET"
+
+SHARED_ROOT = os.path.join( '/dev/shm' if os.path.isdir( '/dev/shm' ) else tempfile.gettempdir(), 'curry_company' )
+
+META_FILE = 'meta.json'
+
+# Muda quando o formato dos arquivos publicados muda / Changes when the layout of the published files changes
+STORE_FORMAT = 2
+
+_stats = { 'published': 0, 'attached': 0, 'mapped_bytes': 0 }
+_stats_lock = threading.Lock()
+
+#====================================================================
+# Classes
+
+class _StoreLock:
+    # Trava exclusiva entre processos do mesmo host / Exclusive lock between processes of the same host
+    def __init__(self, path):
+        self.path = path + '.lock'
+
+    def __enter__(self):
+        self._file = open( self.path, 'a' )
+        if fcntl is not None:
+            fcntl.flock( self._file, fcntl.LOCK_EX )
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock( self._file, fcntl.LOCK_UN )
+        self._file.close()
+
+#====================================================================
+# Functions
+
+def configured_root():
+    """Directory of the shared store from CURRY_SHARED_DATASET (None when off)"""
+    value = os.environ.get( SHARED_ENV, '' ).strip()
+
+    if value.lower() in ( '', '0', 'false', 'no' ):
+        return None
+
+    return SHARED_ROOT if value.lower() in ( '1', 'true', 'yes' ) else value
+
+def store_path(csv_path, root):
+    """Directory holding the published versions of a csv
+
+        Input: csv_path: path of the source csv
+               root: directory of the shared store
+        Output: path under root, unique per absolute csv path
+    """
+    csv_path = os.path.abspath( csv_path )
+    name = os.path.splitext( os.path.basename( csv_path ) )[0]
+
+    return os.path.join( root, f"{name}-{hashlib.sha1( csv_path.encode() ).hexdigest()[:12]}" )
+
+def version_name(csv_path):
+    """Name of the published version of the csv as it is now (size, mtime, cleaning rules, store layout)"""
+    stat = os.stat( csv_path )
+
+    return f"{stat.st_size}-{stat.st_mtime_ns}-v{CACHE_VERSION}.{STORE_FORMAT}"
+
+def _record(**counts):
+    with _stats_lock:
+        for name, value in counts.items():
+            _stats[name] += value
+
+def stats():
+    """Counters of the shared store in this process"""
+    with _stats_lock:
+        return dict( _stats )
+
+register_counters( 'shared_dataset', stats )
+
+def _text_buffers(values):
+    # Offsets e bytes utf-8 no formato do Arrow / Offsets and utf-8 bytes in the Arrow layout
+    array = pa.array( values, type=pa.large_string(), from_pandas=True )
+    if array.null_count:
+        raise ValueError( 'text columns with missing values cannot be shared' )
+
+    _, offsets, data = array.buffers()
+    offsets = np.frombuffer( offsets, dtype=np.int64 )[array.offset : array.offset + len( array ) + 1]
+    data = np.frombuffer( data, dtype=np.uint8 ) if data is not None else np.zeros( 0, dtype=np.uint8 )
+
+    return offsets, data
+
+def _sketch_buffers(values):
+    # Bytes de cada sketch (múltiplos de 8, então os conjuntos exatos ficam alinhados) e offsets
+    # Bytes of every sketch (multiples of 8, so the exact sets stay aligned) and offsets
+    exact = np.array( [is_exact( sketch ) for sketch in values], dtype=bool )
+    sizes = np.array( [sketch.nbytes for sketch in values], dtype=np.int64 )
+    offsets = np.concatenate( [[0], np.cumsum( sizes )] )
+    data = np.concatenate( [sketch.view( np.uint8 ) for sketch in values] ) if len( values ) else np.zeros( 0, dtype=np.uint8 )
+
+    return exact, offsets, data
+
+def _sketch_views(exact, offsets, data):
+    # Um ndarray por célula sobre o mesmo mapeamento / One ndarray per cell over the same mapping
+    views = np.empty( len( exact ), dtype=object )
+    views[:] = [data[start:stop].view( np.uint64 ) if is_set else data[start:stop]
+                for is_set, start, stop in zip( exact.tolist(), offsets[:-1].tolist(), offsets[1:].tolist() )]
+
+    return views
+
+def _is_sketch_column(values):
+    return values.dtype == object and len( values ) > 0 and isinstance( values.iloc[0], np.ndarray )
+
+def write_store(df, directory):
+    """Write the columns of a frame as files that can be memory-mapped
+
+        Input: df: Dataframe (numeric, datetime, categorical, text and sketch columns)
+               directory: new directory to create (must not exist)
+        Output: directory
+    """
+    os.makedirs( directory )
+    columns = []
+
+    for position, col in enumerate( df.columns ):
+        values = df[col]
+        prefix = os.path.join( directory, str( position ) )
+
+        if isinstance( values.dtype, pd.CategoricalDtype ):
+            np.save( prefix + '.npy', values.cat.codes.to_numpy() )
+            columns.append( { 'name': col, 'kind': 'category',
+                              'categories': values.cat.categories.tolist(), 'ordered': bool( values.cat.ordered ) } )
+        elif _is_sketch_column( values ):
+            exact, offsets, data = _sketch_buffers( values.to_numpy() )
+            np.save( prefix + '.exact.npy', exact )
+            np.save( prefix + '.offsets.npy', offsets )
+            np.save( prefix + '.npy', data )
+            columns.append( { 'name': col, 'kind': 'sketch' } )
+        elif values.dtype == object or pd.api.types.is_string_dtype( values.dtype ):
+            offsets, data = _text_buffers( values.to_numpy() )
+            np.save( prefix + '.offsets.npy', offsets )
+            np.save( prefix + '.npy', data )
+            columns.append( { 'name': col, 'kind': 'text' } )
+        else:
+            np.save( prefix + '.npy', values.to_numpy() )
+            columns.append( { 'name': col, 'kind': 'array' } )
+
+    np.save( os.path.join( directory, 'index.npy' ), df.index.to_numpy() )
+
+    # O meta.json vai por último: diretório sem ele está incompleto / meta.json goes last: a directory without it is incomplete
+    with open( os.path.join( directory, META_FILE ), 'w', encoding='utf-8' ) as f:
+        json.dump( { 'rows': len( df ), 'columns': columns }, f )
+
+    return directory
+
+def attach_store(directory):
+    """Memory-map a published frame read-only, without copying it
+
+        Input: directory: output of write_store
+        Output: Dataframe backed by the shared files (text columns as
+                string[pyarrow], sketch columns as object columns of views),
+                or None when the directory is missing or incomplete
+    """
+    try:
+        with open( os.path.join( directory, META_FILE ), encoding='utf-8' ) as f:
+            meta = json.load( f )
+
+        mapped = {}
+        mapped_bytes = 0
+        for position, column in enumerate( meta['columns'] ):
+            prefix = os.path.join( directory, str( position ) )
+            # view: ndarray comum sobre o mesmo mapeamento / view: plain ndarray over the same mapping
+            values = np.load( prefix + '.npy', mmap_mode='r' ).view( np.ndarray )
+            mapped_bytes += values.nbytes
+
+            if column['kind'] == 'category':
+                dtype = pd.CategoricalDtype( column['categories'], ordered=column['ordered'] )
+                mapped[column['name']] = pd.Categorical.from_codes( values, dtype=dtype, validate=False )
+            elif column['kind'] == 'text':
+                offsets = np.load( prefix + '.offsets.npy', mmap_mode='r' ).view( np.ndarray )
+                mapped_bytes += offsets.nbytes
+                array = pa.LargeStringArray.from_buffers( meta['rows'], pa.py_buffer( offsets ), pa.py_buffer( values ) )
+                mapped[column['name']] = pd.arrays.ArrowStringArray( pa.chunked_array( [array], type=pa.large_string() ) )
+            elif column['kind'] == 'sketch':
+                offsets = np.load( prefix + '.offsets.npy', mmap_mode='r' ).view( np.ndarray )
+                mapped_bytes += offsets.nbytes
+                mapped[column['name']] = _sketch_views( np.load( prefix + '.exact.npy' ), offsets, values )
+            else:
+                mapped[column['name']] = values
+
+        index = np.load( os.path.join( directory, 'index.npy' ), mmap_mode='r' ).view( np.ndarray )
+    except FileNotFoundError:
+        return None
+
+    _record( attached=1, mapped_bytes=mapped_bytes + index.nbytes )
+
+    return pd.DataFrame( mapped, index=pd.Index( index, copy=False ), copy=False )
+
+def write_aggregates(aggregates, directory):
+    """Write every table of the aggregates as files that can be memory-mapped
+
+        Input: aggregates: utils.streaming.Aggregates
+               directory: new directory to create (must not exist)
+        Output: directory
+    """
+    os.makedirs( directory )
+    tables = [field for field in Aggregates._fields if field != 'deliverer_ids']
+
+    for field in tables:
+        write_store( getattr( aggregates, field ), os.path.join( directory, field ) )
+
+    # O meta.json vai por último: diretório sem ele está incompleto / meta.json goes last: a directory without it is incomplete
+    with open( os.path.join( directory, META_FILE ), 'w', encoding='utf-8' ) as f:
+        json.dump( { 'tables': tables, 'deliverer_ids': list( aggregates.deliverer_ids ) }, f )
+
+    return directory
+
+def attach_aggregates(directory):
+    """Memory-map published aggregates read-only, without copying them
+
+        Input: directory: output of write_aggregates
+        Output: utils.streaming.Aggregates backed by the shared files, or None
+                when the directory is missing or incomplete
+    """
+    try:
+        with open( os.path.join( directory, META_FILE ), encoding='utf-8' ) as f:
+            meta = json.load( f )
+    except FileNotFoundError:
+        return None
+
+    tables = { field: attach_store( os.path.join( directory, field ) ) for field in meta['tables'] }
+    if any( table is None for table in tables.values() ):
+        return None
+
+    return Aggregates( deliverer_ids=meta['deliverer_ids'], **tables )
+
+def shared_aggregates(csv_path, build, root=None):
+    """Aggregates of the csv from the shared store, publishing them first if needed
+
+        Input: csv_path: path of the source csv
+               build: function () -> utils.streaming.Aggregates (only called by the publisher)
+               root: directory of the shared store (default: CURRY_SHARED_DATASET)
+        Output: read-only Aggregates memory-mapped from the store
+    """
+    base = store_path( csv_path, root or configured_root() or SHARED_ROOT )
+    version = version_name( csv_path )
+    directory = os.path.join( base, version )
+
+    aggregates = attach_aggregates( directory )
+    if aggregates is not None:
+        return aggregates
+
+    os.makedirs( base, exist_ok=True )
+    with _StoreLock( base ):
+        # Outro processo pode ter publicado enquanto esperávamos / Another process may have published while we waited
+        aggregates = attach_aggregates( directory )
+        if aggregates is not None:
+            return aggregates
+
+        tmp_directory = tempfile.mkdtemp( dir=base, prefix='.tmp-' )
+        os.rmdir( tmp_directory )
+        try:
+            write_aggregates( build(), tmp_directory )
+        except BaseException:
+            shutil.rmtree( tmp_directory, ignore_errors=True )
+            raise
+
+        try:
+            os.rename( tmp_directory, directory )
+        except OSError:
+            shutil.rmtree( tmp_directory, ignore_errors=True )
+        _record( published=1 )
+
+        # Versões antigas: quem já as mapeou continua lendo / Old versions: processes that mapped them keep reading
+        for name in os.listdir( base ):
+            if name != version:
+                shutil.rmtree( os.path.join( base, name ), ignore_errors=True )
+
+    return attach_aggregates( directory )
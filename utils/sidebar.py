@@ -0,0 +1,80 @@
+# Libraries
+from datetime import timedelta
+import streamlit as st
+from utils.filters import filter_options, make_filters
+from utils.refresh import refresh_status
+
+#====================================================================
+# Sidebar filters of the pages / Filtros da barra lateral das páginas
+
+# Campo -> título da seção / Field -> section title
+FILTER_TITLES = [('traffic', 'Traffic Conditions'),
+                 ('weather', 'Weather Conditions'),
+                 ('city', 'Cities'),
+                 ('festival', 'Festival'),
+                 ('vehicle', 'Vehicle Types')]
+
+#====================================================================
+# Functions
+
+def keep_widget_state(key, value):
+    # O streamlit apaga o estado dos widgets ao trocar de página; regravar a chave mantém a seleção
+    # Streamlit drops widget state when the page changes; writing the key again keeps the selection
+    st.session_state[key] = value
+
+def sidebar_filters(cube):
+    """Filter widgets of the sidebar, with date bounds and values taken from the data
+
+        The selection is kept in st.session_state, so it follows the user
+        from one page to the other.
+
+        Input: cube: full order cube
+        Output: utils.filters.FilterSpec
+    """
+    options = filter_options( cube )
+    date_min, date_max = ( day.to_pydatetime() for day in options['dates'] )
+    date_max = max( date_max, date_min + timedelta( days=1 ) )
+
+    stored = st.session_state.get( 'filter_dates', ( date_min, date_max ) )
+    keep_widget_state( 'filter_dates', ( min( max( stored[0], date_min ), date_max ), max( min( stored[1], date_max ), date_min ) ) )
+
+    st.sidebar.markdown( '## Select a Date Range' )
+    date_from, date_to = st.sidebar.slider( 'Which dates?',
+                                            min_value=date_min,
+                                            max_value=date_max,
+                                            format='DD-MM-YYYY',
+                                            key='filter_dates' )
+
+    selected = {}
+    for field, title in FILTER_TITLES:
+        key = 'filter_' + field
+        values = options[field]
+        keep_widget_state( key, [value for value in st.session_state.get( key, values ) if value in values] )
+
+        st.sidebar.markdown( """---""" )
+        st.sidebar.markdown( f'## Select desired {title}' )
+        chosen = st.sidebar.multiselect( title, values, key=key, label_visibility='collapsed',
+                                         format_func=lambda value: value.replace( 'conditions ', '' ) )
+
+        # Todos os valores marcados equivalem a não filtrar / Every value selected is the same as no filter
+        selected[field] = None if set( chosen ) == set( values ) else chosen
+
+    return make_filters( date_from, date_to, **selected )
+
+def stop_if_empty(cube):
+    """Stop the page with a warning when no order matches the filters"""
+    if len( cube ) == 0:
+        st.warning( 'No orders match the selected filters.' )
+        st.stop()
+
+def data_freshness():
+    """Sidebar caption with the last background refresh of the data (nothing without a refresher)"""
+    status = refresh_status()
+    if status is None or status.last_refresh is None:
+        return
+
+    caption = f"Data refreshed {status.last_refresh:%d-%m-%Y %H:%M:%S} in {status.duration:.1f}s · {status.rows:,} orders"
+    if status.error:
+        caption += ' · last refresh failed, showing the previous data'
+
+    st.sidebar.caption( caption )
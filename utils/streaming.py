@@ -0,0 +1,140 @@
+# Libraries
+from collections import namedtuple
+import pandas as pd
+from utils.cleaning import clean_code
+from utils.cube import (LOCATION_DIMENSIONS, PROFILE_DIMENSIONS, build_cube, build_delivery_table, build_location_cube, build_profile_cube,
+                        merge_cubes, merge_delivery_tables, update_cube)
+from utils.geo import add_distance
+from utils.instrumentation import traced
+from utils.schema import apply_schema
+
+#====================================================================
+# Chunked ingestion / Leitura do csv em blocos
+#
+# The csv is read in bounded-size chunks. Each chunk is cleaned with the same
+# rules as the full load and aggregated on its own; the chunk cubes are merged
+# as a tree, MERGE_FANIN at a time, so every cell is merged a logarithmic
+# number of times instead of once per chunk, and only one chunk, the cubes
+# and the narrow delivery table are in memory at any time.
+
+CHUNK_ROWS = 100_000
+
+# Cubos pendentes de um nível que disparam um merge / Pending cubes of one level that trigger a merge
+MERGE_FANIN = 8
+
+# Cubos que alimentam as páginas / Cubes the pages render from
+# deliverer_ids: dicionário dos códigos de entregadores do cubo / dictionary of the deliverer codes in the cube
+# locations: pedidos por célula da grade do mapa / orders per map grid cell
+# profiles: perfil diário de cada entregador por cidade / daily profile of every deliverer per city
+# deliveries: um pedido por linha para as métricas por entregador (utils.cube.build_delivery_table)
+#             one order per row for the per-deliverer metrics (utils.cube.build_delivery_table)
+Aggregates = namedtuple( 'Aggregates', ['cube', 'deliverer_ids', 'locations', 'profiles', 'deliveries'] )
+
+#====================================================================
+# Functions
+
+@traced( 'clean' )
+def prepare_chunk(df, deliverer_ids=None):
+    """Clean a raw chunk and encode the deliverers with a shared dictionary
+
+        Input: df: raw chunk read from the csv
+               deliverer_ids: list of Delivery_person_ID seen so far; new ids
+                              are appended, so codes stay stable across chunks
+        Output: cleaned Dataframe ready for build_cube
+    """
+    df = add_distance( apply_schema( clean_code( df ) ) )
+
+    if deliverer_ids is not None:
+        known = set( deliverer_ids )
+        deliverer_ids.extend( sorted( set( df['Delivery_person_ID'].astype( str ).unique() ) - known ) )
+        df['Delivery_person_ID'] = df['Delivery_person_ID'].astype( pd.CategoricalDtype( deliverer_ids ) )
+
+    return df
+
+@traced( 'aggregate' )
+def fold_chunk(aggregates, df):
+    """Fold one prepared chunk into the running aggregates
+
+        Input: aggregates: Aggregates so far (None for the first chunk)
+               df: output of prepare_chunk
+        Output: Aggregates including the chunk
+    """
+    cube = build_cube( df )
+    locations = build_location_cube( df )
+    profiles = build_profile_cube( df )
+    deliveries = build_delivery_table( df )
+
+    chunk = Aggregates( cube, list( df['Delivery_person_ID'].cat.categories ), locations, profiles, deliveries )
+
+    if aggregates is None:
+        return chunk
+
+    return merge_aggregates( [aggregates, chunk] )._replace( deliverer_ids=aggregates.deliverer_ids )
+
+@traced( 'aggregate' )
+def merge_aggregates(parts):
+    """Merge the Aggregates of disjoint sets of orders in one pass
+
+        Input: parts: list of Aggregates whose deliverer codes come from one
+                      shared dictionary (the last one is the most complete)
+        Output: Aggregates of all the orders
+    """
+    if len( parts ) == 1:
+        return parts[0]
+
+    return Aggregates( merge_cubes( [part.cube for part in parts] ),
+                       parts[-1].deliverer_ids,
+                       merge_cubes( [part.locations for part in parts], LOCATION_DIMENSIONS ),
+                       merge_cubes( [part.profiles for part in parts], PROFILE_DIMENSIONS ),
+                       merge_delivery_tables( [part.deliveries for part in parts] ) )
+
+@traced( 'aggregate' )
+def update_aggregates(aggregates, df):
+    """Fold a few new prepared orders into large aggregates (orders appended to the csv)
+
+        Only the cells of the new orders are touched (utils.cube.update_cube).
+
+        Input: aggregates: Aggregates so far
+               df: output of prepare_chunk with the shared deliverer dictionary
+        Output: Aggregates including the new orders
+    """
+    return Aggregates( update_cube( aggregates.cube, build_cube( df ) ),
+                       aggregates.deliverer_ids,
+                       update_cube( aggregates.locations, build_location_cube( df ), LOCATION_DIMENSIONS ),
+                       update_cube( aggregates.profiles, build_profile_cube( df ), PROFILE_DIMENSIONS ),
+                       merge_delivery_tables( [aggregates.deliveries, build_delivery_table( df )] ) )
+
+@traced( 'aggregate' )
+def aggregates_from_frame(df):
+    """Aggregates of a cleaned frame that is already in memory"""
+    return Aggregates( build_cube( df ), list( df['Delivery_person_ID'].cat.categories ),
+                       build_location_cube( df ), build_profile_cube( df ), build_delivery_table( df ) )
+
+def stream_aggregates(path, chunk_rows=CHUNK_ROWS, nrows=None):
+    """Build the aggregates reading the csv chunk by chunk
+
+        Input: path: path of the csv file
+               chunk_rows: rows per chunk (bounds the memory used)
+               nrows: read only the first nrows rows (None reads all)
+        Output: Aggregates
+    """
+    deliverer_ids = []
+    # levels[i]: cubos pendentes com MERGE_FANIN**i blocos cada / pending cubes of MERGE_FANIN**i chunks each
+    levels = [[]]
+
+    for chunk in pd.read_csv( path, encoding="utf-8", chunksize=chunk_rows, nrows=nrows ):
+        levels[0].append( fold_chunk( None, prepare_chunk( chunk, deliverer_ids ) ) )
+
+        level = 0
+        while len( levels[level] ) == MERGE_FANIN:
+            if level + 1 == len( levels ):
+                levels.append( [] )
+            levels[level + 1].append( merge_aggregates( levels[level] ) )
+            levels[level] = []
+            level += 1
+
+    # Maiores primeiro, na ordem do arquivo / Largest first, in file order
+    aggregates = merge_aggregates( [part for level in reversed( levels ) for part in level] )
+
+    # A lista compartilhada segue crescendo nos próximos appends / The shared list keeps growing on later appends
+    return aggregates._replace( deliverer_ids=deliverer_ids )
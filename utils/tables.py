@@ -0,0 +1,63 @@
+# Libraries
+import streamlit as st
+from utils.pagination import PAGE_SIZE
+from utils.sidebar import keep_widget_state
+
+#====================================================================
+# Paginated table widget / Componente de tabela paginada
+#
+# Search, sort and page controls over a utils.pagination.TableIndex. Only
+# the rows of the visible page reach st.dataframe; the controls live in
+# st.session_state under the table key, so every session keeps its own
+# sort and page, also after visiting another page.
+
+#====================================================================
+# Functions
+
+def _keep_controls(key):
+    for suffix in ( 'search', 'sort', 'desc', 'page' ):
+        if f'{key}_{suffix}' in st.session_state:
+            keep_widget_state( f'{key}_{suffix}', st.session_state[f'{key}_{suffix}'] )
+
+def paged_table(key, table, page_size=PAGE_SIZE):
+    """Render one page of a table with search, sort and page controls
+
+        Input: key: unique key of the table on the page
+               table: utils.pagination.TableIndex
+               page_size: rows per page
+        Output: utils.pagination.TablePage shown
+    """
+    _keep_controls( key )
+    columns = list( table.frame.columns )
+
+    col1, col2, col3 = st.columns( [3, 3, 2] )
+    with col1:
+        search = None
+        if table.search_column is not None:
+            search = st.text_input( 'Search', key=f'{key}_search', placeholder=table.search_column )
+    with col2:
+        sort_by = st.selectbox( 'Sort by', columns, key=f'{key}_sort' )
+    with col3:
+        descending = st.toggle( 'Descending', key=f'{key}_desc' )
+
+    # Nova busca ou ordem volta à primeira página / A new search or order goes back to the first page
+    query = ( search, sort_by, descending )
+    if st.session_state.get( f'{key}_query' ) != query:
+        st.session_state[f'{key}_query'] = query
+        st.session_state[f'{key}_page'] = 1
+
+    # Página ajustada ao número de páginas atual / Page clamped to the current number of pages
+    result = table.page( st.session_state.get( f'{key}_page', 1 ), page_size, sort_by, descending, search )
+    st.session_state[f'{key}_page'] = result.page
+
+    st.dataframe( result.rows, hide_index=True, use_container_width=True )
+
+    col1, col2 = st.columns( [1, 2] )
+    with col1:
+        st.number_input( 'Page', min_value=1, max_value=result.pages, step=1, key=f'{key}_page' )
+    with col2:
+        first = ( result.page - 1 ) * page_size + 1 if result.total else 0
+        last = min( result.page * page_size, result.total )
+        st.caption( f'Rows {first}-{last} of {result.total} · page {result.page} of {result.pages}' )
+
+    return result
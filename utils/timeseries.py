@@ -0,0 +1,100 @@
+# Libraries
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from utils.cube import SET_MEASURE
+from utils.instrumentation import traced
+from utils.sketch import EMPTY_SKETCH, estimate, merge_sketches, rolling_distinct
+
+#====================================================================
+# Growth time series / Séries temporais de crescimento
+#
+# The order cube is resampled on a continuous daily index (days without
+# orders count zero) with integer ISO keys: iso_week = ISO year * 100 + ISO
+# week, iso_day = 1 (Monday) to 7. One distinct-deliverer sketch is merged per
+# day, and the rolling windows and the ISO weeks merge those day sketches,
+# so active deliverers are distinct over the whole window, never a sum of
+# daily counts.
+
+ROLLING_WINDOWS = ( 7, 28 )
+
+# daily: uma linha por dia / one row per day
+# weekly: uma linha por semana ISO / one row per ISO week
+Growth = namedtuple( 'Growth', ['daily', 'weekly'] )
+
+#====================================================================
+# Functions
+
+def iso_keys(dates):
+    """Integer ISO week (year * 100 + week) and ISO weekday (1 = Monday)
+
+        Input: dates: datetimes (Series, Index or array)
+        Output: (iso_week, iso_day) int64 arrays
+    """
+    iso = pd.DatetimeIndex( dates ).isocalendar()
+
+    return iso['year'].to_numpy( np.int64 ) * 100 + iso['week'].to_numpy( np.int64 ), iso['day'].to_numpy( np.int64 )
+
+def _ratio(numerator, denominator):
+    return numerator / denominator.where( denominator > 0 )
+
+def _growth_rate(values, periods):
+    # Crescimento relativo ao período anterior / Growth relative to the previous period
+    previous = values.shift( periods )
+
+    return values / previous.where( previous > 0 ) - 1
+
+@traced( 'aggregate' )
+def growth(cube, windows=ROLLING_WINDOWS):
+    """Daily and weekly order and active-deliverer series with growth rates
+
+        Input: cube: order cube (or a slice of it)
+               windows: rolling window lengths in days
+        Output: Growth with
+                daily: indexed by Order_Date, with iso_week, iso_day, orders,
+                       deliverers, orders_per_deliverer and, per window w,
+                       orders_<w>d, deliverers_<w>d, orders_per_deliverer_<w>d
+                       and orders_<w>d_growth (against the previous w days)
+                weekly: iso_week, week (label 'YYYY-Www'), week_start (Monday),
+                        days (days of the week in the data range), orders,
+                        deliverers, orders_per_deliverer and the week-over-week
+                        growth orders_wow, deliverers_wow, orders_per_deliverer_wow
+    """
+    by_day = cube.groupby( 'Order_Date' )
+    orders = by_day['orders'].sum()
+
+    if len( orders ) == 0:
+        return Growth( pd.DataFrame(), pd.DataFrame() )
+
+    days = pd.date_range( orders.index.min(), orders.index.max(), freq='D', name='Order_Date' )
+    day_sketches = { day: merge_sketches( part ) for day, part in by_day[SET_MEASURE] }
+    sketches = [day_sketches.get( day, EMPTY_SKETCH ) for day in days]
+
+    daily = pd.DataFrame( { 'orders': orders.reindex( days, fill_value=0 ).to_numpy() }, index=days )
+    daily['iso_week'], daily['iso_day'] = iso_keys( days )
+    daily['deliverers'] = [estimate( sketch ) for sketch in sketches]
+    daily['orders_per_deliverer'] = _ratio( daily['orders'], daily['deliverers'] )
+
+    for window in windows:
+        daily[f'orders_{window}d'] = daily['orders'].rolling( window ).sum()
+        daily[f'deliverers_{window}d'] = rolling_distinct( sketches, window )
+        daily[f'orders_per_deliverer_{window}d'] = _ratio( daily[f'orders_{window}d'], daily[f'deliverers_{window}d'] )
+        daily[f'orders_{window}d_growth'] = _growth_rate( daily[f'orders_{window}d'], window )
+
+    # Semanas ISO: soma dos dias e união dos sketches dos dias / ISO weeks: sum of the days and union of the day sketches
+    week_start = days - pd.to_timedelta( daily['iso_day'] - 1, unit='D' )
+    weekly = ( daily.assign( week_start=week_start )
+                    .groupby( 'iso_week' )
+                    .agg( week_start=( 'week_start', 'first' ), days=( 'orders', 'size' ), orders=( 'orders', 'sum' ) )
+                    .reset_index() )
+    weekly.insert( 1, 'week', [f'{week // 100}-W{week % 100:02d}' for week in weekly['iso_week']] )
+
+    positions = daily.groupby( 'iso_week' ).indices
+    weekly['deliverers'] = [estimate( merge_sketches( sketches[i] for i in positions[week] ) ) for week in weekly['iso_week']]
+    weekly['orders_per_deliverer'] = _ratio( weekly['orders'], weekly['deliverers'] )
+
+    # Semanas consecutivas: o índice diário é contínuo / Consecutive weeks: the daily index is continuous
+    for col in ( 'orders', 'deliverers', 'orders_per_deliverer' ):
+        weekly[f'{col}_wow'] = _growth_rate( weekly[col], 1 )
+
+    return Growth( daily, weekly )